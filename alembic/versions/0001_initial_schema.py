@@ -0,0 +1,68 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-16 12:00:00.000000
+
+The schema as originally created by Base.metadata.create_all. Databases that
+were bootstrapped that way should be stamped with `alembic stamp 0001` before
+upgrading.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'players',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('discord_id', sa.Integer(), unique=True),
+        sa.Column('battletag', sa.String(), unique=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_table(
+        'characters',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('player_id', sa.Integer(), sa.ForeignKey('players.id')),
+        sa.Column('name', sa.String()),
+        sa.Column('realm', sa.String()),
+        sa.Column('class_name', sa.String()),
+        sa.Column('item_level', sa.Integer()),
+        sa.Column('raiderio_score', sa.Integer()),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_table(
+        'groups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('dungeon', sa.String()),
+        sa.Column('keystone_level', sa.Integer()),
+        sa.Column('note', sa.String()),
+        sa.Column('is_filled', sa.Boolean()),
+        sa.Column('host_id', sa.Integer(), sa.ForeignKey('players.id')),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    op.create_table(
+        'group_players',
+        sa.Column('group_id', sa.Integer(), sa.ForeignKey('groups.id')),
+        sa.Column('player_id', sa.Integer(), sa.ForeignKey('players.id')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('group_players')
+    op.drop_table('groups')
+    op.drop_table('characters')
+    op.drop_table('players')
@@ -0,0 +1,92 @@
+"""indexes, constraints and snowflake key types
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('players') as batch_op:
+        batch_op.alter_column('discord_id', type_=sa.BigInteger(), existing_type=sa.Integer())
+
+    with op.batch_alter_table('groups') as batch_op:
+        batch_op.add_column(sa.Column('member_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('guild_id', sa.BigInteger()))
+        batch_op.add_column(sa.Column('channel_id', sa.BigInteger()))
+        batch_op.add_column(sa.Column('message_id', sa.BigInteger()))
+        batch_op.create_index('ix_groups_message_id', ['message_id'], unique=True)
+        batch_op.create_index('ix_groups_host_id', ['host_id'])
+        batch_op.create_index('ix_groups_created_at', ['created_at'])
+        batch_op.create_index('ix_groups_is_filled_created_at', ['is_filled', 'created_at'])
+
+    # Rebuild group_players with a primary key, dropping NULL and duplicate rows
+    # and keeping only each player's most recent group.
+    op.rename_table('group_players', 'group_players_old')
+    op.create_table(
+        'group_players',
+        sa.Column('group_id', sa.Integer(), sa.ForeignKey('groups.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('player_id', sa.Integer(), sa.ForeignKey('players.id', ondelete='CASCADE'), primary_key=True),
+        sa.UniqueConstraint('player_id', name='uq_group_players_player_id'),
+    )
+    op.execute(
+        "INSERT INTO group_players (group_id, player_id) "
+        "SELECT max(old.group_id), old.player_id FROM group_players_old old "
+        "JOIN groups ON groups.id = old.group_id "
+        "WHERE old.player_id IS NOT NULL "
+        "GROUP BY old.player_id"
+    )
+    op.drop_table('group_players_old')
+    op.execute(
+        "UPDATE groups SET member_count = "
+        "(SELECT count(*) FROM group_players WHERE group_players.group_id = groups.id)"
+    )
+    op.execute("DELETE FROM groups WHERE member_count = 0")
+
+    with op.batch_alter_table('characters') as batch_op:
+        batch_op.create_unique_constraint('uq_characters_player_name_realm', ['player_id', 'name', 'realm'])
+    op.create_index(
+        'ix_characters_refreshed_at',
+        'characters',
+        [sa.text('coalesce(updated_at, created_at)')]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_characters_refreshed_at', table_name='characters')
+    with op.batch_alter_table('characters') as batch_op:
+        batch_op.drop_constraint('uq_characters_player_name_realm', type_='unique')
+
+    op.rename_table('group_players', 'group_players_new')
+    op.create_table(
+        'group_players',
+        sa.Column('group_id', sa.Integer(), sa.ForeignKey('groups.id')),
+        sa.Column('player_id', sa.Integer(), sa.ForeignKey('players.id')),
+    )
+    op.execute("INSERT INTO group_players (group_id, player_id) SELECT group_id, player_id FROM group_players_new")
+    op.drop_table('group_players_new')
+
+    with op.batch_alter_table('groups') as batch_op:
+        batch_op.drop_index('ix_groups_is_filled_created_at')
+        batch_op.drop_index('ix_groups_created_at')
+        batch_op.drop_index('ix_groups_host_id')
+        batch_op.drop_index('ix_groups_message_id')
+        batch_op.drop_column('message_id')
+        batch_op.drop_column('channel_id')
+        batch_op.drop_column('guild_id')
+        batch_op.drop_column('member_count')
+
+    with op.batch_alter_table('players') as batch_op:
+        batch_op.alter_column('discord_id', type_=sa.Integer(), existing_type=sa.BigInteger())
@@ -0,0 +1,50 @@
+"""group_events log and dungeon_stats rollups
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'group_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), primary_key=True),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('event', sa.String(), nullable=False),
+        sa.Column('player_id', sa.Integer()),
+        sa.Column('guild_id', sa.BigInteger()),
+        sa.Column('dungeon', sa.String()),
+        sa.Column('keystone_level', sa.Integer()),
+        sa.Column('elapsed_seconds', sa.Float()),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_table(
+        'dungeon_stats',
+        sa.Column('dungeon', sa.String(), primary_key=True),
+        sa.Column('keystone_level', sa.Integer(), primary_key=True),
+        sa.Column('groups_created', sa.Integer(), nullable=False),
+        sa.Column('groups_filled', sa.Integer(), nullable=False),
+        sa.Column('groups_expired', sa.Integer(), nullable=False),
+        sa.Column('joins', sa.Integer(), nullable=False),
+        sa.Column('leaves', sa.Integer(), nullable=False),
+        sa.Column('fill_seconds_total', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dungeon_stats')
+    op.drop_table('group_events')
@@ -0,0 +1,37 @@
+"""per-guild config and guild-scoped group index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'guild_configs',
+        sa.Column('guild_id', sa.BigInteger(), primary_key=True, autoincrement=False),
+        sa.Column('dungeons', sa.String()),
+        sa.Column('max_keystone_level', sa.Integer()),
+        sa.Column('expiry_hours', sa.Integer()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index(
+        'ix_groups_guild_id_is_filled_created_at', 'groups', ['guild_id', 'is_filled', 'created_at', 'id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_groups_guild_id_is_filled_created_at', table_name='groups')
+    op.drop_table('guild_configs')
@@ -0,0 +1,36 @@
+"""raiderio_profiles cache table
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'raiderio_profiles',
+        sa.Column('region', sa.String(), primary_key=True),
+        sa.Column('realm', sa.String(), primary_key=True),
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('fields', sa.String(), nullable=False),
+        sa.Column('profile', sa.String(), nullable=False),
+        sa.Column('etag', sa.String()),
+        sa.Column('last_modified', sa.String()),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('raiderio_profiles')
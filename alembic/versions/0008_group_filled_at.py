@@ -0,0 +1,30 @@
+"""groups.filled_at so a refilled group is only counted as filled once
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('groups') as batch_op:
+        batch_op.add_column(sa.Column('filled_at', sa.DateTime(), nullable=True))
+    # Groups that are full now have already been counted
+    op.execute("UPDATE groups SET filled_at = COALESCE(updated_at, created_at) WHERE is_filled")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('groups') as batch_op:
+        batch_op.drop_column('filled_at')
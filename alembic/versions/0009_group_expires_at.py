@@ -0,0 +1,29 @@
+"""groups.expires_at so changing a guild's expiry only affects new groups
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Left NULL for existing groups, which keep expiring by their guild's current setting
+    with op.batch_alter_table('groups') as batch_op:
+        batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('groups') as batch_op:
+        batch_op.drop_column('expires_at')
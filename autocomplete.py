@@ -0,0 +1,68 @@
+from bisect import bisect_left
+from typing import Dict, List
+
+class PrefixIndex:
+    """Sorted array of `(casefolded key, value)` pairs searched with bisect."""
+
+    def __init__(self):
+        self.items: List[tuple] = []
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, key: str, value):
+        item = (key.casefold(), value)
+        i = bisect_left(self.items, item)
+        if i == len(self.items) or self.items[i] != item:
+            self.items.insert(i, item)
+
+    def remove(self, key: str, value):
+        item = (key.casefold(), value)
+        i = bisect_left(self.items, item)
+        if i < len(self.items) and self.items[i] == item:
+            del self.items[i]
+
+    def search(self, prefix: str, limit: int = 25) -> list:
+        prefix = prefix.casefold()
+        results = []
+        for i in range(bisect_left(self.items, (prefix,)), len(self.items)):
+            key, value = self.items[i]
+            if not key.startswith(prefix) or len(results) >= limit:
+                break
+            results.append(value)
+        return results
+
+class CharacterIndex:
+    """Known realms and each user's linked characters, for autocomplete.
+
+    Loaded once at startup and updated as characters are linked, so answering
+    a keystroke never touches the database.
+    """
+
+    def __init__(self):
+        self.realms = PrefixIndex()
+        self.characters: Dict[int, PrefixIndex] = {}
+
+    def load(self, rows):
+        """Rebuild from `(discord_id, name, realm)` rows."""
+        self.realms = PrefixIndex()
+        self.characters.clear()
+        realms, characters = set(), {}
+        for row in rows:
+            realms.add(row.realm)
+            characters.setdefault(row.discord_id, []).append((row.name.casefold(), (row.name, row.realm)))
+        self.realms.items = sorted((realm.casefold(), realm) for realm in realms)
+        for discord_id, items in characters.items():
+            index = self.characters[discord_id] = PrefixIndex()
+            index.items = sorted(items)
+
+    def add(self, discord_id: int, name: str, realm: str):
+        self.realms.add(realm, realm)
+        index = self.characters.get(discord_id)
+        if index is None:
+            index = self.characters[discord_id] = PrefixIndex()
+        index.add(name, (name, realm))
+
+    def characters_of(self, discord_id: int, prefix: str, limit: int = 25) -> list:
+        index = self.characters.get(discord_id)
+        return index.search(prefix, limit) if index is not None else []
@@ -0,0 +1,48 @@
+"""Fire concurrent joins at single groups against a throwaway SQLite database
+and fail if any group is overfilled or its member_count drifts from its
+members.
+
+    python -m bench.check_contention
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="lfg-contention-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/contention.db"
+
+import main  # noqa: E402
+from database import engine  # noqa: E402
+from edits import EditScheduler  # noqa: E402
+from models import Base  # noqa: E402
+from bench.contention import run_contention, run_db_contention  # noqa: E402
+from bench.fakes import FakeChannel, install  # noqa: E402
+
+async def fake_score(name, realm, region='us', allow_stale=True):
+    return 2500
+
+async def run_checks():
+    channel = FakeChannel()
+    install(main.client, channel)
+    main.client.edits = EditScheduler(delay=0, rate=10_000, burst=10_000)
+    main.get_raiderio_score = fake_score
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    results = {
+        "contention": await run_contention(channel, 1000),
+        "db_contention": await run_db_contention(channel, 2000)
+    }
+    await main.client.edits.drain()
+    await engine.dispose()
+    return results
+
+def main_():
+    results = asyncio.run(run_checks())
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if any(result["overfilled"] for result in results.values()) else 0)
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,81 @@
+"""Run every command handler once against a throwaway SQLite database and fail
+if any of them issues more SQL statements than its QUERY_BUDGETS entry.
+
+    python -m bench.check_query_budgets
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="lfg-budget-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/budget.db"
+
+import main  # noqa: E402
+from database import engine  # noqa: E402
+from models import Base  # noqa: E402
+from querybudget import QueryBudgetExceeded, query_budget  # noqa: E402
+from bench.fakes import FakeChannel, FakeInteraction, button_interaction, install  # noqa: E402
+
+async def fake_score(name, realm, region='us', allow_stale=True):
+    return 2500
+
+async def run_checks():
+    channel = FakeChannel()
+    install(main.client, channel)
+    main.get_raiderio_score = fake_score
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def invoke(command, user_id, *args, **kwargs):
+        interaction = FakeInteraction(user_id, channel)
+        await command.callback(interaction, *args, **kwargs)
+        return interaction
+
+    for user_id in range(2, 8):
+        await invoke(main.link_character, user_id, f"Char{user_id}", "Realm", "Mage", 620)
+    # Group 1, for the disband check; the lfg check below creates group 2
+    await invoke(main.lfg, 4, main.SUPPORTED_DUNGEONS[0], 5, None)
+
+    checks = [
+        ("link_character", lambda: invoke(main.link_character, 8, "Char8", "Realm", "Mage", 620)),
+        ("update_character", lambda: invoke(main.update_character_cmd, 8, "Char8", "Realm", "Mage", 625)),
+        ("lfg", lambda: invoke(main.lfg, 2, main.SUPPORTED_DUNGEONS[0], 10, None)),
+        ("list_groups", lambda: invoke(main.list_groups, 3)),
+        ("button_join", lambda: main.on_interaction(button_interaction(3, post(2), "join"))),
+        ("group_info", lambda: uncached(invoke(main.group_info, 3, 2))),
+        ("my_groups", lambda: invoke(main.my_groups, 3)),
+        ("button_leave", lambda: main.on_interaction(button_interaction(3, post(2), "leave"))),
+        ("leave", lambda: invoke(main.leave, 2)),
+        ("button_disband", lambda: main.on_interaction(button_interaction(4, post(1), "disband"))),
+        ("stats", lambda: invoke(main.stats, 3)),
+        ("configure", lambda: invoke(main.configure, 2, main.SUPPORTED_DUNGEONS[1], False, 25, 12)),
+    ]
+
+    def uncached(call):
+        # The join above rendered group 2; drop it so the database path is what gets counted
+        main.client.embeds.entries.clear()
+        return call
+
+    def post(group_id):
+        return list(channel.messages.values())[group_id - 1]
+
+    failures = 0
+    for handler, run in checks:
+        try:
+            with query_budget(engine, handler) as counter:
+                await run()
+            print(f"ok    {handler:<18} {counter.count} queries")
+        except QueryBudgetExceeded as e:
+            failures += 1
+            print(f"FAIL  {e}")
+
+    await main.client.edits.drain()
+    await engine.dispose()
+    return failures
+
+def main_():
+    sys.exit(1 if asyncio.run(run_checks()) else 0)
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,70 @@
+"""Concurrent joins against a single group, checking it is never overfilled.
+
+`run_contention` goes through the button handler, where the cache and the
+group locks serialize joins; `run_db_contention` calls `add_player_to_group`
+directly from separate sessions without either, so the capacity guard in the
+database is exercised on its own. Both expect `main.client` to be installed
+with bench.fakes and a working Raider.IO lookup.
+"""
+import asyncio
+import time
+import sqlalchemy
+import main
+from config import MAX_GROUP_SIZE, SUPPORTED_DUNGEONS
+from database import SessionLocal, add_player_to_group, get_group, unit_of_work
+from bench.fakes import FakeInteraction, button_interaction
+
+async def run_contention(channel, base_id: int, joiners: int = 200):
+    users = [base_id + i for i in range(joiners + 1)]
+    for user_id in users:
+        await main.link_character.callback(FakeInteraction(user_id, channel), f"Rush{user_id}", "Illidan", "Rogue", 600)
+    await main.lfg.callback(FakeInteraction(users[0], channel), SUPPORTED_DUNGEONS[0], 10, None)
+    post = next(reversed(channel.messages.values()))
+    group_id = main.client.groups.group_of(main.client.groups.player_id_for(users[0])).id
+
+    started = time.perf_counter()
+    await asyncio.gather(*[main.on_interaction(button_interaction(user_id, post, "join")) for user_id in users[1:]])
+    elapsed = time.perf_counter() - started
+
+    async with SessionLocal() as session:
+        group = await get_group(session, group_id)
+    members = len(group.players)
+    return {
+        "concurrent_joins": joiners,
+        "members": members,
+        "member_count": group.member_count,
+        "overfilled": members > MAX_GROUP_SIZE or group.member_count != members,
+        "elapsed_ms": round(elapsed * 1000, 2)
+    }
+
+async def run_db_contention(channel, base_id: int, joiners: int = 200):
+    users = [base_id + i for i in range(joiners + 1)]
+    for user_id in users:
+        await main.link_character.callback(FakeInteraction(user_id, channel), f"Race{user_id}", "Illidan", "Rogue", 600)
+    await main.lfg.callback(FakeInteraction(users[0], channel), SUPPORTED_DUNGEONS[0], 10, None)
+    group_id = main.client.groups.group_of(main.client.groups.player_id_for(users[0])).id
+    player_ids = [main.client.groups.player_id_for(user_id) for user_id in users[1:]]
+
+    async def join(player_id):
+        try:
+            async with unit_of_work() as session:
+                return await add_player_to_group(session, group_id, player_id) is not None
+        except sqlalchemy.exc.SQLAlchemyError:
+            return None
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[join(player_id) for player_id in player_ids])
+    elapsed = time.perf_counter() - started
+
+    async with SessionLocal() as session:
+        group = await get_group(session, group_id)
+    members = len(group.players)
+    return {
+        "concurrent_joins": joiners,
+        "accepted": results.count(True),
+        "errors": results.count(None),
+        "members": members,
+        "member_count": group.member_count,
+        "overfilled": members > MAX_GROUP_SIZE or group.member_count != members,
+        "elapsed_ms": round(elapsed * 1000, 2)
+    }
@@ -0,0 +1,117 @@
+"""Stand-ins for the discord.py objects the command handlers touch.
+
+They record what the bot sent instead of talking to Discord, which is enough
+to drive every handler offline.
+"""
+import types
+from itertools import count
+import discord
+
+_ids = count(10_000)
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.discriminator = "0001"
+        self.bot = False
+        self.dms = []
+
+    async def send(self, content=None, **kwargs):
+        self.dms.append(content)
+
+class FakeMessage:
+    def __init__(self, channel, embed=None, view=None):
+        self.id = next(_ids)
+        self.channel = channel
+        self.embeds = [embed] if embed is not None else []
+        self.view = view
+        self.edits = 0
+
+    async def edit(self, **kwargs):
+        self.edits += 1
+        if "embed" in kwargs:
+            self.embeds = [kwargs["embed"]]
+        if "view" in kwargs:
+            self.view = kwargs["view"]
+
+class FakeChannel:
+    def __init__(self, channel_id: int = 1):
+        self.id = channel_id
+        self.messages = {}
+
+    async def send(self, content=None, embed=None, view=None, **kwargs):
+        message = FakeMessage(self, embed, view)
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id: int):
+        return self.messages.get(message_id) or FakeMessage(self)
+
+class FakeResponse:
+    def __init__(self):
+        self.done = False
+        self.sent = []
+
+    async def defer(self, **kwargs):
+        self.done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self.done = True
+        self.sent.append((content, kwargs))
+
+    async def edit_message(self, **kwargs):
+        self.done = True
+        self.sent.append((None, kwargs))
+
+    async def autocomplete(self, choices):
+        self.done = True
+        self.sent.append((None, {"choices": choices}))
+
+    def is_done(self):
+        return self.done
+
+class FakeFollowup:
+    def __init__(self, channel):
+        self.channel = channel
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((content, kwargs))
+        return FakeMessage(self.channel, kwargs.get("embed"), kwargs.get("view"))
+
+class FakeInteraction:
+    def __init__(self, user_id: int, channel: FakeChannel, guild_id: int = 1, message=None, command_name: str = None):
+        self.id = next(_ids)
+        self.type = discord.InteractionType.application_command
+        self.data = {}
+        self.user = FakeUser(user_id)
+        self.channel = channel
+        self.channel_id = channel.id
+        self.guild_id = guild_id
+        self.guild = types.SimpleNamespace(id=guild_id)
+        self.message = message
+        self.command = types.SimpleNamespace(name=command_name) if command_name else None
+        self.namespace = types.SimpleNamespace()
+        self.extras = {}
+        self.response = FakeResponse()
+        self.followup = FakeFollowup(channel)
+
+    @property
+    def replies(self):
+        return self.response.sent + self.followup.sent
+
+def button_interaction(user_id: int, message: FakeMessage, action: str, guild_id: int = 1):
+    """A click on one of the buttons of the group post `message`."""
+    custom_id = next(item.custom_id for item in message.view.children if item.custom_id.startswith(f"lfg:{action}:"))
+    interaction = FakeInteraction(user_id, message.channel, guild_id, message=message)
+    interaction.type = discord.InteractionType.component
+    interaction.data = {"custom_id": custom_id, "component_type": 2}
+    return interaction
+
+def install(client, channel: FakeChannel, bot_user_id: int = 1):
+    """Point `client` at the fake channel instead of the Discord API."""
+    client._connection.user = types.SimpleNamespace(id=bot_user_id)
+    client.get_partial_messageable = lambda channel_id, **kwargs: channel
+    client.get_channel = lambda channel_id: channel
+    client.get_user = lambda user_id: FakeUser(user_id)
@@ -0,0 +1,220 @@
+"""Offline benchmark of every command handler.
+
+Seeds a local SQLite database with each requested number of groups, starts a
+stub Raider.IO server, drives the handlers through fake Discord objects and
+reports p50/p95/p99 latency, SQL statements per call and peak allocation per
+call as JSON:
+
+    python -m bench.run --sizes 100,10000 --iterations 200 --output bench.json
+    python -m bench.run --compare old.json new.json
+
+The contention checks from bench.contention also run at each size, and fail
+the run if a group is ever overfilled; `python -m bench.check_contention`
+runs them on their own.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+_db_dir = tempfile.mkdtemp(prefix="lfg-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_db_dir}/bench.db")
+
+import sqlalchemy  # noqa: E402
+import main  # noqa: E402
+from config import SUPPORTED_DUNGEONS  # noqa: E402
+from database import SessionLocal, engine, get_active_group_state  # noqa: E402
+from querybudget import QueryCounter  # noqa: E402
+from edits import EditScheduler  # noqa: E402
+from raiderio import RaiderIOClient  # noqa: E402
+from bench.contention import run_contention, run_db_contention  # noqa: E402
+from bench.fakes import FakeChannel, FakeInteraction, button_interaction, install  # noqa: E402
+from bench.seed import reset, seed  # noqa: E402
+from bench.stub_raiderio import StubRaiderIO  # noqa: E402
+
+BENCH_DISCORD_ID_BASE = 10 ** 16
+ALLOC_SAMPLE_EVERY = 10
+
+class HandlerStats:
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.allocations = []
+
+    async def measure(self, sample: int, call):
+        counter = QueryCounter(engine)
+        trace = sample % ALLOC_SAMPLE_EVERY == 0
+        if trace:
+            tracemalloc.start()
+        with counter:
+            started = time.perf_counter()
+            await call()
+            elapsed = time.perf_counter() - started
+        if trace:
+            self.allocations.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        else:
+            # Traced calls run slower, so keep them out of the latency figures
+            self.latencies.append(elapsed)
+        self.queries.append(counter.count)
+
+    def summary(self):
+        latencies = sorted(self.latencies) or [0.0]
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))] * 1000
+
+        return {
+            "calls": len(self.queries),
+            "p50_ms": round(percentile(50), 3),
+            "p95_ms": round(percentile(95), 3),
+            "p99_ms": round(percentile(99), 3),
+            "queries_per_call": round(statistics.mean(self.queries), 2) if self.queries else 0,
+            "alloc_peak_kib": round(statistics.mean(self.allocations) / 1024, 1) if self.allocations else 0
+        }
+
+async def run_size(groups: int, iterations: int):
+    rng = random.Random(groups)
+    await reset(engine)
+    started = time.perf_counter()
+    await seed(engine, groups, rng)
+    seed_seconds = time.perf_counter() - started
+
+    channel = FakeChannel()
+    install(main.client, channel)
+    main.client.edits = EditScheduler(delay=0, rate=10_000, burst=10_000)
+    async with SessionLocal() as session:
+        main.client.groups.load(*await get_active_group_state(session))
+
+    stats = {name: HandlerStats() for name in (
+        "link_character", "lfg", "button_join", "my_groups", "group_info",
+        "list_groups", "button_leave", "leave"
+    )}
+    hosts = [BENCH_DISCORD_ID_BASE + groups * 10 + i for i in range(iterations)]
+    joiners = [BENCH_DISCORD_ID_BASE + groups * 10 + iterations + i for i in range(iterations)]
+    posts = {}
+
+    def invoke(command, user_id, *args, **kwargs):
+        async def call():
+            interaction = FakeInteraction(user_id, channel)
+            await command.callback(interaction, *args, **kwargs)
+            if command.name == "lfg":
+                posts[user_id] = next(reversed(channel.messages.values()))
+        return call
+
+    for joiner in joiners:
+        await invoke(main.link_character, joiner, f"Joiner{joiner}", "Illidan", "Priest", 610)()
+
+    for i, host in enumerate(hosts):
+        await stats["link_character"].measure(i, invoke(main.link_character, host, f"Host{host}", "Stormrage", "Mage", 620))
+    for i, host in enumerate(hosts):
+        await stats["lfg"].measure(i, invoke(main.lfg, host, rng.choice(SUPPORTED_DUNGEONS), rng.randint(2, 20), None))
+    for i, (host, joiner) in enumerate(zip(hosts, joiners)):
+        click = button_interaction(joiner, posts[host], "join")
+        await stats["button_join"].measure(i, lambda: main.on_interaction(click))
+    for i, joiner in enumerate(joiners):
+        await stats["my_groups"].measure(i, invoke(main.my_groups, joiner))
+    for i in range(iterations):
+        await stats["group_info"].measure(i, invoke(main.group_info, joiners[i], rng.randint(1, groups)))
+    for i, joiner in enumerate(joiners):
+        await stats["list_groups"].measure(i, invoke(main.list_groups, joiner))
+    for i, (host, joiner) in enumerate(zip(hosts, joiners)):
+        click = button_interaction(joiner, posts[host], "leave")
+        await stats["button_leave"].measure(i, lambda: main.on_interaction(click))
+    for i, host in enumerate(hosts):
+        await stats["leave"].measure(i, invoke(main.leave, host))
+
+    contention_base = BENCH_DISCORD_ID_BASE + groups * 10 + 2 * iterations
+    contention = await run_contention(channel, contention_base)
+    db_contention = await run_db_contention(channel, contention_base + 1000)
+    await main.client.edits.drain()
+    return {
+        "groups": groups,
+        "seed_seconds": round(seed_seconds, 2),
+        "handlers": {name: handler.summary() for name, handler in stats.items()},
+        "contention": contention,
+        "db_contention": db_contention
+    }
+
+async def run(sizes, iterations: int, latency: float):
+    stub = StubRaiderIO(latency=latency)
+    main.client.raiderio = RaiderIOClient(base_url=await stub.start(), rate_limit=10_000, burst=10_000)
+    try:
+        results = {}
+        for size in sizes:
+            print(f"Benchmarking {size} groups...", file=sys.stderr)
+            results[str(size)] = await run_size(size, iterations)
+    finally:
+        await main.client.raiderio.close()
+        await stub.stop()
+        await engine.dispose()
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "database": engine.url.get_backend_name(),
+            "iterations": iterations,
+            "raiderio_latency_ms": latency * 1000,
+            "stub_requests": stub.requests
+        },
+        "results": results
+    }
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    with open(old_path) as f:
+        old = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+
+    regressions = 0
+    for size, result in new.items():
+        if size not in old:
+            continue
+        for handler, current in result["handlers"].items():
+            previous = old[size]["handlers"].get(handler)
+            if previous is None:
+                continue
+            for metric in ("p50_ms", "p95_ms", "p99_ms", "queries_per_call", "alloc_peak_kib"):
+                before, after = previous[metric], current[metric]
+                if before and after > before * (1 + threshold):
+                    regressions += 1
+                    print(f"REGRESSION {size:>8} {handler:<28} {metric:<16} {before} -> {after}")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,10000", help="comma separated group counts, e.g. 100,10000,1000000")
+    parser.add_argument("--iterations", type=int, default=100, help="calls per handler and size")
+    parser.add_argument("--raiderio-latency", type=float, default=0.0, help="stub Raider.IO latency in seconds")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two reports and exit non-zero on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown counted as a regression")
+    return parser.parse_args(argv)
+
+def main_(argv=None):
+    args = parse_args(argv)
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    report = asyncio.run(run(sizes, args.iterations, args.raiderio_latency))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if any(result[check]["overfilled"] for result in report["results"].values() for check in ("contention", "db_contention")):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,71 @@
+"""Bulk-load a database with a given number of active groups."""
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from config import SUPPORTED_DUNGEONS, MAX_GROUP_SIZE
+from models import Base, Player, Character, Group, group_players
+
+SEED_DISCORD_ID_BASE = 10 ** 15
+BATCH_SIZE = 10_000
+
+async def reset(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+async def seed(engine, groups: int, rng: random.Random = None):
+    """Create `groups` open or filled groups, each with a host and up to three
+    more members, every member with one linked character. Returns the number
+    of players created."""
+    rng = rng or random.Random(0)
+    now = datetime.utcnow()
+    player_id = 0
+    players, characters, group_rows, memberships = [], [], [], []
+
+    async def flush(conn):
+        # Parents before children
+        for table, rows in ((Player.__table__, players), (Character.__table__, characters),
+                            (Group.__table__, group_rows), (group_players, memberships)):
+            if rows:
+                await conn.execute(insert(table), rows)
+                rows.clear()
+
+    async with engine.begin() as conn:
+        for group_id in range(1, groups + 1):
+            size = rng.randint(1, MAX_GROUP_SIZE - 1) if rng.random() < 0.9 else MAX_GROUP_SIZE
+            members = []
+            for _ in range(size):
+                player_id += 1
+                members.append(player_id)
+                players.append({
+                    "id": player_id,
+                    "discord_id": SEED_DISCORD_ID_BASE + player_id,
+                    "battletag": f"seed{player_id}#0001"
+                })
+                characters.append({
+                    "player_id": player_id,
+                    "name": f"Seed{player_id}",
+                    "realm": rng.choice(("Area 52", "Illidan", "Stormrage", "Tichondrius")),
+                    "class_name": rng.choice(("Mage", "Priest", "Warrior", "Druid", "Rogue")),
+                    "item_level": rng.randint(590, 640),
+                    "raiderio_score": rng.randint(500, 3500),
+                    "created_at": now
+                })
+            group_rows.append({
+                "id": group_id,
+                "dungeon": rng.choice(SUPPORTED_DUNGEONS),
+                "keystone_level": rng.randint(2, 25),
+                "note": None,
+                "is_filled": size >= MAX_GROUP_SIZE,
+                "member_count": size,
+                "host_id": members[0],
+                "guild_id": 1,
+                "channel_id": 1,
+                "message_id": SEED_DISCORD_ID_BASE + group_id,
+                "created_at": now - timedelta(seconds=groups - group_id)
+            })
+            memberships.extend({"group_id": group_id, "player_id": member} for member in members)
+            if len(memberships) >= BATCH_SIZE:
+                await flush(conn)
+        await flush(conn)
+    return player_id
@@ -0,0 +1,159 @@
+"""Run several sharded worker processes against one SQLite database and check
+that their group caches converge over the Unix socket event bus.
+
+Each worker owns one shard. Instead of a gateway connection it is fed
+button clicks for the guilds on its shard: a waiting player joins every
+open group and the host of every third group leaves. Once all workers are
+done, each compares its cache with the database.
+
+    python -m bench.shards --workers 3 --groups 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+WAITING_DISCORD_ID_BASE = 10 ** 16
+
+def guild_for(group_id: int, shards: int) -> int:
+    # Guild IDs whose shard, (guild_id >> 22) % shards, is group_id % shards
+    return (group_id % shards + shards) << 22
+
+async def prepare(groups: int, shards: int):
+    import random
+    from sqlalchemy import insert, update
+    from database import engine
+    from models import Character, Group, Player
+    from bench.seed import reset, seed
+
+    await reset(engine)
+    players = await seed(engine, groups, random.Random(groups))
+    async with engine.begin() as conn:
+        for group_id in range(1, groups + 1):
+            await conn.execute(update(Group).where(Group.id == group_id).values(guild_id=guild_for(group_id, shards)))
+        waiting = range(players + 1, players + groups + 1)
+        await conn.execute(insert(Player.__table__), [
+            {"id": player_id, "discord_id": WAITING_DISCORD_ID_BASE + player_id, "battletag": f"wait{player_id}#0001"}
+            for player_id in waiting
+        ])
+        await conn.execute(insert(Character.__table__), [
+            {"player_id": player_id, "name": f"Wait{player_id}", "realm": "Illidan", "class_name": "Priest",
+             "item_level": 610, "raiderio_score": 2000}
+            for player_id in waiting
+        ])
+    await engine.dispose()
+    return players
+
+async def worker(first_waiting: int):
+    import main
+    from database import SessionLocal, engine, get_active_group_state
+    from edits import EditScheduler
+    from bench.fakes import FakeChannel, FakeMessage, button_interaction, install
+
+    client = main.client
+    channel = FakeChannel()
+    install(client, channel)
+    client.edits = EditScheduler(delay=0, rate=10_000, burst=10_000)
+    await client.bus.start()
+    async with SessionLocal() as session:
+        groups, memberships = await get_active_group_state(session)
+    client.groups.load(groups, memberships)
+
+    loop = asyncio.get_running_loop()
+    print("ready", flush=True)
+    await loop.run_in_executor(None, sys.stdin.readline)
+
+    owned = [state for state in list(client.groups.groups.values()) if client.owns_guild(state.guild_id)]
+    for state in owned:
+        post = FakeMessage(channel, view=main.GroupView(state.id))
+        if not state.is_full:
+            user_id = WAITING_DISCORD_ID_BASE + first_waiting + state.id - 1
+            await main.on_interaction(button_interaction(user_id, post, "join", state.guild_id))
+        if state.id % 3 == 0:
+            host_discord_id = client.groups.active_discord_ids[state.host_id]
+            await main.on_interaction(button_interaction(host_discord_id, post, "leave", state.guild_id))
+
+    print("acted", flush=True)
+    await loop.run_in_executor(None, sys.stdin.readline)
+
+    async with SessionLocal() as session:
+        groups, memberships = await get_active_group_state(session)
+    expected = {row.id: set() for row in groups}
+    for row in memberships:
+        expected[row.group_id].add(row.player_id)
+    actual = {group_id: state.members for group_id, state in client.groups.groups.items()}
+    print(json.dumps({
+        "shard": client.shard_ids[0],
+        "owned_groups": len(owned),
+        "published": client.bus.published,
+        "received": client.bus.received,
+        "consistent": actual == expected
+    }), flush=True)
+    await client.edits.drain()
+    await client.bus.close()
+    await engine.dispose()
+
+def run(workers: int, groups: int) -> bool:
+    directory = tempfile.mkdtemp(prefix="lfg-shards-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite+aiosqlite:///{directory}/shards.db",
+        EVENT_BUS="unix",
+        EVENT_BUS_SOCKET_DIR=f"{directory}/bus",
+        SHARD_COUNT=str(workers),
+        DISCORD_TOKEN=os.environ.get("DISCORD_TOKEN", "bench")
+    )
+    os.environ.update(env)
+    players = asyncio.run(prepare(groups, workers))
+
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "bench.shards", "--worker", str(players + 1)],
+            env=dict(env, SHARD_IDS=str(shard)), stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        for shard in range(workers)
+    ]
+
+    def step(expected: str):
+        for proc in procs:
+            line = proc.stdout.readline().strip()
+            if line != expected:
+                raise RuntimeError(f"worker sent {line!r}, expected {expected!r}")
+
+    def broadcast():
+        for proc in procs:
+            proc.stdin.write("\n")
+            proc.stdin.flush()
+
+    try:
+        step("ready")
+        broadcast()
+        step("acted")
+        broadcast()
+        reports = [json.loads(proc.stdout.readline()) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.wait(timeout=30)
+    for report in reports:
+        print(json.dumps(report))
+    return all(report["consistent"] for report in reports)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=3, help="worker processes, one shard each")
+    parser.add_argument("--groups", type=int, default=60, help="groups to seed")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main_(argv=None):
+    args = parse_args(argv)
+    if args.worker is not None:
+        asyncio.run(worker(args.worker))
+        return
+    sys.exit(0 if run(args.workers, args.groups) else 1)
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,42 @@
+"""Local aiohttp server that answers Raider.IO profile lookups."""
+import asyncio
+import zlib
+from aiohttp import web
+
+class StubRaiderIO:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.runner = None
+        self.url = None
+
+    async def profile(self, request: web.Request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        name = request.query.get("name", "")
+        if name.lower().startswith("missing"):
+            return web.json_response({"error": "Could not find requested character"}, status=400)
+        # Stable per-name score so repeated runs are comparable
+        score = 1000 + zlib.crc32(name.encode()) % 2500
+        return web.json_response({
+            "name": name,
+            "realm": request.query.get("realm"),
+            "region": request.query.get("region"),
+            "mythic_plus_scores_by_season": [{"season": "current", "scores": {"all": float(score)}}]
+        })
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        app = web.Application()
+        app.router.add_get("/api/v1/characters/profile", self.profile)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
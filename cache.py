@@ -0,0 +1,190 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+from config import MAX_GROUP_SIZE, PLAYER_CACHE_SIZE
+from autocomplete import PrefixIndex
+
+class GroupState:
+    __slots__ = (
+        "id", "dungeon", "keystone_level", "host_id", "guild_id", "channel_id", "message_id", "members", "version"
+    )
+
+    def __init__(self, id: int, dungeon: str, keystone_level: int, host_id: int, guild_id: Optional[int],
+                 channel_id: Optional[int], message_id: Optional[int], members: Set[int], version: int = 0):
+        self.id = id
+        self.dungeon = dungeon
+        self.keystone_level = keystone_level
+        self.host_id = host_id
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.members = members
+        self.version = version
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.members) >= MAX_GROUP_SIZE
+
+def group_payload(group) -> dict:
+    """JSON-serialisable snapshot of an ORM `Group` with players loaded."""
+    return {
+        "id": group.id,
+        "dungeon": group.dungeon,
+        "keystone_level": group.keystone_level,
+        "host_id": group.host_id,
+        "guild_id": group.guild_id,
+        "channel_id": group.channel_id,
+        "message_id": group.message_id,
+        "created_at": group.created_at.isoformat() if group.created_at else None,
+        "expires_at": group.expires_at.isoformat() if group.expires_at else None,
+        "version": group.version,
+        "members": [[player.id, player.discord_id] for player in group.players]
+    }
+
+class GroupStateCache:
+    """In-process view of every active group and who is in it.
+
+    The database stays the source of truth: handlers write through to this
+    cache after each committed join/leave/create/expire, and it is rebuilt from
+    the database at startup. Members of active groups are always tracked; the
+    discord_id -> player_id map for everyone else is an LRU capped at
+    `max_players`.
+    """
+
+    def __init__(self, max_players: int = PLAYER_CACHE_SIZE):
+        self.max_players = max_players
+        self.groups: Dict[int, GroupState] = {}
+        self.player_groups: Dict[int, int] = {}
+        self.active_players: Dict[int, int] = {}
+        self.active_discord_ids: Dict[int, int] = {}
+        self.known_players: "OrderedDict[int, int]" = OrderedDict()
+        # Each guild's group IDs as text, for /group_info autocomplete and per-guild scans
+        self.guild_groups: Dict[Optional[int], PrefixIndex] = {}
+
+    def load(self, groups, memberships):
+        """Rebuild from `(id, dungeon, keystone_level, host_id, guild_id, channel_id, message_id, version)` group rows and
+        `(group_id, player_id, discord_id)` membership rows."""
+        self.groups.clear()
+        self.player_groups.clear()
+        self.active_players.clear()
+        self.active_discord_ids.clear()
+        self.guild_groups.clear()
+        for row in groups:
+            self.groups[row.id] = GroupState(
+                row.id, row.dungeon, row.keystone_level, row.host_id, row.guild_id, row.channel_id, row.message_id,
+                set(), row.version
+            )
+        for row in memberships:
+            state = self.groups.get(row.group_id)
+            if state is None:
+                continue
+            state.members.add(row.player_id)
+            self.player_groups[row.player_id] = row.group_id
+            self.active_players[row.discord_id] = row.player_id
+            self.active_discord_ids[row.player_id] = row.discord_id
+        for state in self.groups.values():
+            self.guild_groups.setdefault(state.guild_id, PrefixIndex()).items.append((str(state.id), state.id))
+        for index in self.guild_groups.values():
+            index.items.sort()
+
+    def remember_player(self, discord_id: int, player_id: int):
+        if discord_id in self.active_players:
+            return
+        self.known_players[discord_id] = player_id
+        self.known_players.move_to_end(discord_id)
+        while len(self.known_players) > self.max_players:
+            self.known_players.popitem(last=False)
+
+    def player_id_for(self, discord_id: int) -> Optional[int]:
+        player_id = self.active_players.get(discord_id)
+        if player_id is not None:
+            return player_id
+        player_id = self.known_players.get(discord_id)
+        if player_id is not None:
+            self.known_players.move_to_end(discord_id)
+        return player_id
+
+    def group_of(self, player_id: int) -> Optional[GroupState]:
+        group_id = self.player_groups.get(player_id)
+        return self.groups.get(group_id) if group_id is not None else None
+
+    def search(self, guild_id: Optional[int], prefix: str, limit: int = 25) -> List[GroupState]:
+        """A guild's active groups whose ID starts with `prefix`."""
+        index = self.guild_groups.get(guild_id)
+        return [self.groups[group_id] for group_id in index.search(prefix, limit)] if index is not None else []
+
+    def open_groups(self, guild_id: Optional[int]):
+        index = self.guild_groups.get(guild_id)
+        if index is None:
+            return []
+        return [state for state in (self.groups[group_id] for _, group_id in index.items) if not state.is_full]
+
+    def sync_group(self, group):
+        """Write through the committed state of an ORM `Group` with players loaded."""
+        self.apply(group_payload(group))
+
+    def apply(self, payload: dict):
+        """Write through a `group_payload` snapshot, e.g. one received from another process."""
+        group_id = payload["id"]
+        members = {player_id: discord_id for player_id, discord_id in payload["members"]}
+        if not members:
+            self.remove_group(group_id)
+            return
+
+        state = self.groups.get(group_id)
+        old_members = state.members if state is not None else set()
+        new_members = set(members)
+        if state is None:
+            state = self.groups[group_id] = GroupState(
+                group_id, payload["dungeon"], payload["keystone_level"], payload["host_id"], payload["guild_id"],
+                payload["channel_id"], payload["message_id"], new_members, payload["version"]
+            )
+            self._index(state.guild_id).add(str(group_id), group_id)
+        else:
+            if state.guild_id != payload["guild_id"]:
+                self._unindex(state)
+                self._index(payload["guild_id"]).add(str(group_id), group_id)
+            state.host_id = payload["host_id"]
+            state.guild_id = payload["guild_id"]
+            state.channel_id = payload["channel_id"]
+            state.message_id = payload["message_id"]
+            state.members = new_members
+            state.version = payload["version"]
+
+        for player_id, discord_id in members.items():
+            self.player_groups[player_id] = group_id
+            self.known_players.pop(discord_id, None)
+            self.active_players[discord_id] = player_id
+            self.active_discord_ids[player_id] = discord_id
+        for player_id in old_members - new_members:
+            self._release_player(player_id, group_id)
+
+    def remove_group(self, group_id: int):
+        state = self.groups.pop(group_id, None)
+        if state is None:
+            return
+        self._unindex(state)
+        for player_id in state.members:
+            self._release_player(player_id, group_id)
+
+    def _index(self, guild_id: Optional[int]) -> PrefixIndex:
+        index = self.guild_groups.get(guild_id)
+        if index is None:
+            index = self.guild_groups[guild_id] = PrefixIndex()
+        return index
+
+    def _unindex(self, state: GroupState):
+        index = self.guild_groups.get(state.guild_id)
+        if index is None:
+            return
+        index.remove(str(state.id), state.id)
+        if not len(index):
+            del self.guild_groups[state.guild_id]
+
+    def _release_player(self, player_id: int, group_id: int):
+        if self.player_groups.get(player_id) != group_id:
+            return
+        del self.player_groups[player_id]
+        discord_id = self.active_discord_ids.pop(player_id, None)
+        if discord_id is not None:
+            del self.active_players[discord_id]
+            self.remember_player(discord_id, player_id)
@@ -1,13 +1,32 @@
+import logging
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
-raw_db_url = os.getenv('DATABASE_URL')
-DATABASE_URL = raw_db_url.replace('postgres://', 'postgresql://') + '?sslmode=require'
+# Sync commands to this guild only (instant, not rate limited like global syncs); for development
+DEV_GUILD_ID = int(os.getenv('DEV_GUILD_ID')) if os.getenv('DEV_GUILD_ID') else None
+raw_db_url = os.getenv('DATABASE_URL', 'sqlite+aiosqlite:///wow_lfg_bot.db')
+if raw_db_url.startswith('sqlite'):
+    DATABASE_URL = raw_db_url
+else:
+    DATABASE_URL = (
+        raw_db_url
+        .replace('postgres://', 'postgresql+asyncpg://', 1)
+        .replace('postgresql://', 'postgresql+asyncpg://', 1)
+        + '?ssl=require'
+    )
 
-# ... rest of your config ...
+# Connection pool tuning (ignored for SQLite)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '500'))
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '200'))
+DB_SLOW_QUERY_SAMPLE_RATE = float(os.getenv('DB_SLOW_QUERY_SAMPLE_RATE', '0.1'))
 
 SUPPORTED_DUNGEONS = [
     "Ara-Kara, City of Echoes",
@@ -21,4 +40,86 @@ SUPPORTED_DUNGEONS = [
 ]
 
 MAX_GROUP_SIZE = 5
-GROUP_EXPIRY_HOURS = 24
\ No newline at end of file
+GROUP_EXPIRY_HOURS = 24
+MIN_KEYSTONE_LEVEL = 2
+MAX_KEYSTONE_LEVEL = 30
+
+# Group expiry
+EXPIRY_BATCH_SIZE = int(os.getenv('EXPIRY_BATCH_SIZE', '50'))
+EXPIRY_BATCH_DELAY = float(os.getenv('EXPIRY_BATCH_DELAY', '1'))
+
+# Raider.IO client
+RAIDERIO_BASE_URL = os.getenv('RAIDERIO_BASE_URL', 'https://raider.io')
+RAIDERIO_TIMEOUT = float(os.getenv('RAIDERIO_TIMEOUT', '5'))
+RAIDERIO_MAX_CONNECTIONS = int(os.getenv('RAIDERIO_MAX_CONNECTIONS', '10'))
+RAIDERIO_RATE_LIMIT = float(os.getenv('RAIDERIO_RATE_LIMIT', '5'))  # requests per second
+RAIDERIO_BURST = int(os.getenv('RAIDERIO_BURST', '10'))
+RAIDERIO_MAX_RETRIES = int(os.getenv('RAIDERIO_MAX_RETRIES', '3'))
+
+# Raider.IO profile cache: in memory, backed by the raiderio_profiles table
+RAIDERIO_PROFILE_FIELDS = os.getenv('RAIDERIO_PROFILE_FIELDS', 'mythic_plus_scores_by_season:current,gear')
+RAIDERIO_CACHE_SIZE = int(os.getenv('RAIDERIO_CACHE_SIZE', '5000'))  # profiles kept in memory
+RAIDERIO_CACHE_TTL = int(os.getenv('RAIDERIO_CACHE_TTL', '900'))  # seconds a profile is served as-is
+RAIDERIO_CACHE_MAX_STALE = int(os.getenv('RAIDERIO_CACHE_MAX_STALE', '86400'))  # seconds a stale profile is served while revalidating
+
+# Background Raider.IO score refresh
+SCORE_REFRESH_INTERVAL = int(os.getenv('SCORE_REFRESH_INTERVAL', '600'))  # seconds between cycles
+SCORE_REFRESH_MAX_AGE_HOURS = int(os.getenv('SCORE_REFRESH_MAX_AGE_HOURS', '24'))
+SCORE_REFRESH_BUDGET = int(os.getenv('SCORE_REFRESH_BUDGET', '200'))  # characters per cycle
+SCORE_REFRESH_CONCURRENCY = int(os.getenv('SCORE_REFRESH_CONCURRENCY', '4'))
+SCORE_REFRESH_BATCH_SIZE = int(os.getenv('SCORE_REFRESH_BATCH_SIZE', '50'))
+
+# Group post edit scheduling
+EDIT_DEBOUNCE_SECONDS = float(os.getenv('EDIT_DEBOUNCE_SECONDS', '1.0'))
+EDIT_RATE_LIMIT = float(os.getenv('EDIT_RATE_LIMIT', '1.0'))  # edits per second per channel
+EDIT_BURST = int(os.getenv('EDIT_BURST', '5'))
+
+# In-memory state cache
+PLAYER_CACHE_SIZE = int(os.getenv('PLAYER_CACHE_SIZE', '10000'))
+EMBED_CACHE_SIZE = int(os.getenv('EMBED_CACHE_SIZE', '1000'))  # rendered group embeds
+
+# /list_groups page size (Discord allows at most 25 embed fields)
+GROUP_LIST_PAGE_SIZE = int(os.getenv('GROUP_LIST_PAGE_SIZE', '10'))
+
+# Matchmaking queue
+MATCHMAKING_TICK_SECONDS = float(os.getenv('MATCHMAKING_TICK_SECONDS', '5'))
+MATCHMAKING_BAND_WIDTH = int(os.getenv('MATCHMAKING_BAND_WIDTH', '3'))  # keystone levels per bucket
+
+# Prometheus metrics endpoint
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+METRICS_HOST = os.getenv('METRICS_HOST', '0.0.0.0')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9100'))
+
+# Logging
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'wow_lfg_bot.log')
+LOG_JSON = os.getenv('LOG_JSON', 'true').lower() == 'true'
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Per-level sampling, e.g. "DEBUG=0.01,INFO=0.5"; levels not listed are always kept
+LOG_SAMPLE_RATES = {
+    logging.getLevelName(level.strip().upper()): float(rate)
+    for level, rate in (
+        item.split('=', 1) for item in os.getenv('LOG_SAMPLE_RATES', '').split(',') if item.strip()
+    )
+}
+
+# Sharding: SHARD_IDS is the range this process runs, e.g. "0-3" or "0,2"
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = None
+if os.getenv('SHARD_IDS'):
+    SHARD_IDS = []
+    for part in os.getenv('SHARD_IDS').split(','):
+        first, _, last = part.partition('-')
+        SHARD_IDS.extend(range(int(first), int(last or first) + 1))
+
+# Cross-process event bus: "local" (single process) or "unix"
+EVENT_BUS = os.getenv('EVENT_BUS', 'local')
+EVENT_BUS_SOCKET_DIR = os.getenv('EVENT_BUS_SOCKET_DIR', '/tmp/wow_lfg_bot-bus')
+
+# Group event log and stats rollups
+EVENT_LOG_BATCH_SIZE = int(os.getenv('EVENT_LOG_BATCH_SIZE', '500'))
+EVENT_LOG_FLUSH_SECONDS = float(os.getenv('EVENT_LOG_FLUSH_SECONDS', '2'))
+EVENT_LOG_MAX_PENDING = int(os.getenv('EVENT_LOG_MAX_PENDING', '50000'))
+STATS_ROLLUP_INTERVAL = int(os.getenv('STATS_ROLLUP_INTERVAL', '300'))
+# Events younger than this are left for the next rollup, so batches still being flushed aren't skipped
+STATS_ROLLUP_LAG_SECONDS = int(os.getenv('STATS_ROLLUP_LAG_SECONDS', '60'))
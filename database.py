@@ -1,16 +1,78 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import delete, exists, func, insert, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from models import Player, Character, Group
+from sqlalchemy.orm import joinedload, selectinload
+from config import (
+    DATABASE_URL,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE,
+    MAX_GROUP_SIZE
+)
+from metrics import instrument_engine
+from models import Player, Character, Group, GuildConfig, BotState, GroupEvent, DungeonStats, RaiderIOProfile, group_players
+
+def make_engine(url: str = DATABASE_URL):
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        return create_async_engine(url)
+
+    if url.get_driver_name() == 'asyncpg':
+        url = url.update_query_dict({'prepared_statement_cache_size': str(DB_STATEMENT_CACHE_SIZE)})
+    return create_async_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        query_cache_size=DB_STATEMENT_CACHE_SIZE
+    )
+
+def make_sessionmaker(bind):
+    return async_sessionmaker(bind=bind, expire_on_commit=False)
+
+engine = make_engine()
+instrument_engine(engine)
+SessionLocal = make_sessionmaker(engine)
+
+@asynccontextmanager
+async def unit_of_work(session_factory=SessionLocal):
+    """One transaction for a whole command or event.
+
+    The helpers below never commit; writes made through them commit together
+    when the block exits, or roll back if it raises. Keep network I/O (Discord,
+    Raider.IO) outside the block so no connection is held while waiting on it.
+    """
+    async with session_factory() as session:
+        async with session.begin():
+            yield session
+
+# Everything create_group_embed touches, in three queries however many groups
+# or members: groups joined to their host, then members, then their characters.
+GROUP_RENDER_OPTIONS = (
+    joinedload(Group.host),
+    selectinload(Group.players).selectinload(Player.characters)
+)
 
 async def get_player(session: AsyncSession, discord_id: int):
     result = await session.execute(select(Player).where(Player.discord_id == discord_id))
     return result.scalars().first()
 
+async def get_player_by_id(session: AsyncSession, player_id: int):
+    return await session.get(Player, player_id)
+
 async def create_player(session: AsyncSession, discord_id: int, battletag: str):
     player = Player(discord_id=discord_id, battletag=battletag)
     session.add(player)
-    await session.commit()
+    await session.flush()
     return player
 
 async def get_character(session: AsyncSession, player_id: int, name: str, realm: str):
@@ -23,59 +85,145 @@ async def get_character(session: AsyncSession, player_id: int, name: str, realm:
     )
     return result.scalars().first()
 
-async def create_character(session: AsyncSession, player_id: int, name: str, realm: str, class_name: str, item_level: int):
-    character = Character(player_id=player_id, name=name, realm=realm, class_name=class_name, item_level=item_level)
+async def get_best_character(session: AsyncSession, player_id: int):
+    result = await session.execute(
+        select(Character)
+        .where(Character.player_id == player_id)
+        .order_by(Character.raiderio_score.desc().nulls_last(), Character.id)
+        .limit(1)
+    )
+    return result.scalars().first()
+
+async def create_character(session: AsyncSession, player_id: int, name: str, realm: str, class_name: str, item_level: int,
+                           raiderio_score: int = None):
+    character = Character(
+        player_id=player_id, name=name, realm=realm, class_name=class_name, item_level=item_level,
+        raiderio_score=raiderio_score
+    )
     session.add(character)
-    await session.commit()
+    await session.flush()
     return character
 
-async def get_group(session: AsyncSession, group_id: int):
+async def get_groups_for_render(session: AsyncSession, group_ids):
+    if not group_ids:
+        return []
     result = await session.execute(
         select(Group)
-        .options(selectinload(Group.host), selectinload(Group.players))
-        .where(Group.id == group_id)
+        .options(*GROUP_RENDER_OPTIONS)
+        .where(Group.id.in_(group_ids))
+        .execution_options(populate_existing=True)
     )
-    return result.scalars().first()
+    return result.unique().scalars().all()
+
+async def get_group(session: AsyncSession, group_id: int):
+    groups = await get_groups_for_render(session, [group_id])
+    return groups[0] if groups else None
 
-async def create_group(session: AsyncSession, host: Player, dungeon: str, keystone_level: int, note: str):
-    group = Group(host=host, dungeon=dungeon, keystone_level=keystone_level, note=note)
+async def create_group(session: AsyncSession, host: Player, dungeon: str, keystone_level: int, note: str,
+                       guild_id: int = None, expires_at: datetime = None):
+    group = Group(
+        host=host, dungeon=dungeon, keystone_level=keystone_level, note=note, member_count=1, guild_id=guild_id,
+        expires_at=expires_at
+    )
     group.players.append(host)
     session.add(group)
-    await session.commit()
-    return group
-
-async def add_player_to_group(session: AsyncSession, group: Group, player: Player):
-    if player not in group.players:
-        group.players.append(player)
-        if len(group.players) == 5:
-            group.is_filled = True
-        await session.commit()
-
-async def remove_player_from_group(session: AsyncSession, group: Group, player: Player):
-    if player in group.players:
-        group.players.remove(player)
-        group.is_filled = False
-        if len(group.players) == 0:
-            await session.delete(group)
-        elif group.host == player and group.players:
-            group.host = group.players[0]
-        await session.commit()
-
-async def update_character_score(session: AsyncSession, character: Character, raiderio_score: int):
-    character.raiderio_score = raiderio_score
-    await session.commit()
-
-# Add this function to the existing database.py file
+    await session.flush()
+    return await get_group(session, group.id)
 
-async def get_group(session: AsyncSession, group_id: int):
+async def set_group_message(session: AsyncSession, group_id: int, guild_id: int, channel_id: int, message_id: int):
+    await session.execute(
+        update(Group)
+        .where(Group.id == group_id)
+        .values(guild_id=guild_id, channel_id=channel_id, message_id=message_id)
+        .execution_options(synchronize_session=False)
+    )
+
+async def add_player_to_group(session: AsyncSession, group_id: int, player_id: int, max_size: int = MAX_GROUP_SIZE):
+    """Atomically add a player to a group.
+
+    The capacity check and increment happen in one conditional UPDATE, which
+    holds the group's row lock until commit, and the unique player_id on
+    group_players enforces one group per player. Returns the new
+    `(member_count, is_filled)` row, or None if the group is gone or full or
+    the player is already in a group; both writes run in a savepoint, so in
+    the latter case only they are rolled back and the unit of work goes on.
+    """
+    try:
+        async with session.begin_nested():
+            result = await session.execute(
+                update(Group)
+                .where(Group.id == group_id, Group.member_count < max_size)
+                .values(
+                    member_count=Group.member_count + 1, is_filled=Group.member_count + 1 >= max_size,
+                    version=Group.version + 1
+                )
+                .returning(Group.member_count, Group.is_filled)
+                .execution_options(synchronize_session=False)
+            )
+            state = result.first()
+            if state is None:
+                return None
+            await session.execute(insert(group_players).values(group_id=group_id, player_id=player_id))
+    except IntegrityError:
+        return None
+    return state
+
+async def mark_group_filled(session: AsyncSession, group_id: int) -> bool:
+    """Stamp `filled_at` on a group that just filled; False if it had filled before."""
     result = await session.execute(
-        select(Group)
-        .options(selectinload(Group.host), selectinload(Group.players))
+        update(Group)
+        .where(Group.id == group_id, Group.filled_at.is_(None))
+        .values(filled_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+async def remove_player_from_group(session: AsyncSession, group_id: int, player_id: int):
+    """Atomically remove a player from a group, handing off or disbanding it.
+
+    Returns the number of members left (0 means the group was deleted), or None
+    if the player wasn't in the group.
+    """
+    result = await session.execute(
+        delete(group_players)
+        .where(group_players.c.group_id == group_id, group_players.c.player_id == player_id)
+    )
+    if result.rowcount == 0:
+        return None
+
+    result = await session.execute(
+        update(Group)
         .where(Group.id == group_id)
+        .values(member_count=Group.member_count - 1, is_filled=False, version=Group.version + 1)
+        .returning(Group.member_count)
+        .execution_options(synchronize_session=False)
     )
-    return result.scalars().first()
+    remaining = result.scalar_one()
+    if remaining <= 0:
+        await session.execute(delete(Group).where(Group.id == group_id))
+        remaining = 0
+    else:
+        next_host = (
+            select(func.min(group_players.c.player_id))
+            .where(group_players.c.group_id == group_id)
+            .scalar_subquery()
+        )
+        await session.execute(
+            update(Group)
+            .where(Group.id == group_id, Group.host_id == player_id)
+            .values(host_id=next_host)
+            .execution_options(synchronize_session=False)
+        )
+    return remaining
 
-# Add this function to the existing database.py file
+async def bump_player_group_versions(session: AsyncSession, player_ids):
+    """Mark the groups `player_ids` are in as changed, e.g. after a character update."""
+    await session.execute(
+        update(Group)
+        .where(Group.id.in_(select(group_players.c.group_id).where(group_players.c.player_id.in_(player_ids))))
+        .values(version=Group.version + 1)
+        .execution_options(synchronize_session=False)
+    )
 
 async def get_player_groups(session: AsyncSession, player_id: int):
     result = await session.execute(
@@ -85,29 +233,226 @@ async def get_player_groups(session: AsyncSession, player_id: int):
     )
     return result.scalars().all()
 
-# Add these functions to the existing database.py file
+async def update_character(session: AsyncSession, character_id: int, class_name: str, item_level: int, raiderio_score: int):
+    await session.execute(
+        update(Character)
+        .where(Character.id == character_id)
+        .values(class_name=class_name, item_level=item_level, raiderio_score=raiderio_score, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
 
-from sqlalchemy import func
-from datetime import datetime, timedelta
+async def get_active_groups_page(session: AsyncSession, guild_id: int, limit: int, after: tuple = None,
+                                 dungeon: str = None, min_level: int = None, max_level: int = None,
+                                 min_score: int = None, open_slots: int = None, channel_id: int = None,
+                                 max_size: int = MAX_GROUP_SIZE):
+    """Return one page of a guild's open groups, newest first, and whether more follow.
 
-async def update_character(session: AsyncSession, character, class_name: str, item_level: int, raiderio_score: int):
-    character.class_name = class_name
-    character.item_level = item_level
-    character.raiderio_score = raiderio_score
-    character.updated_at = func.now()
-    await session.commit()
+    Pages are keyset-paginated on `(created_at, id)`: pass the last row's
+    `(created_at, id)` as `after` to get the next page. Member counts come from
+    the `member_count` column, so nothing per-group is loaded.
+    """
+    query = (
+        select(Group.id, Group.dungeon, Group.keystone_level, Group.member_count, Group.created_at)
+        .where(Group.guild_id == guild_id, Group.is_filled == False)
+    )
+    if channel_id is not None:
+        query = query.where(Group.channel_id == channel_id)
+    if after is not None:
+        query = query.where(
+            tuple_(Group.created_at, Group.id) < tuple_(*after, types=[Group.created_at.type, Group.id.type])
+        )
+    if dungeon is not None:
+        query = query.where(Group.dungeon == dungeon)
+    if min_level is not None:
+        query = query.where(Group.keystone_level >= min_level)
+    if max_level is not None:
+        query = query.where(Group.keystone_level <= max_level)
+    if open_slots is not None:
+        query = query.where(Group.member_count <= max_size - open_slots)
+    if min_score is not None:
+        query = query.where(exists().where(
+            Character.player_id == Group.host_id,
+            Character.raiderio_score >= min_score
+        ))
 
-async def get_all_active_groups(session: AsyncSession):
     result = await session.execute(
-        select(Group)
-        .where(Group.is_filled == False)
-        .order_by(Group.created_at.desc())
+        query.order_by(Group.created_at.desc(), Group.id.desc()).limit(limit + 1)
+    )
+    rows = result.all()
+    return rows[:limit], len(rows) > limit
+
+async def delete_groups(session: AsyncSession, group_ids):
+    result = await session.execute(
+        select(
+            Group.id, Group.dungeon, Group.keystone_level, Group.guild_id, Group.channel_id, Group.message_id,
+            Group.created_at
+        )
+        .where(Group.id.in_(group_ids))
+    )
+    deleted = result.all()
+    if deleted:
+        ids = [group.id for group in deleted]
+        # Delete memberships explicitly: SQLite doesn't enforce ON DELETE CASCADE by default
+        await session.execute(delete(group_players).where(group_players.c.group_id.in_(ids)))
+        await session.execute(delete(Group).where(Group.id.in_(ids)))
+    return deleted
+
+async def get_stale_characters(session: AsyncSession, older_than: datetime, limit: int):
+    last_refreshed = func.coalesce(Character.updated_at, Character.created_at)
+    result = await session.execute(
+        select(Character.id, Character.name, Character.realm)
+        .where(last_refreshed < older_than)
+        .order_by(last_refreshed)
+        .limit(limit)
+    )
+    return result.all()
+
+async def bulk_update_character_scores(session: AsyncSession, scores: dict):
+    """Write new scores; returns the IDs of the groups whose members' scores changed.
+
+    Characters whose score is unchanged only get `updated_at` touched, and
+    their groups keep their version, so their embeds aren't re-rendered.
+    """
+    if not scores:
+        return []
+    current = await session.execute(
+        select(Character.id, Character.raiderio_score).where(Character.id.in_(list(scores)))
+    )
+    changed = {character_id: scores[character_id] for character_id, score in current.all()
+               if score != scores[character_id]}
+    await touch_characters(session, [character_id for character_id in scores if character_id not in changed])
+    if not changed:
+        return []
+
+    now = datetime.utcnow()
+    await session.execute(
+        update(Character),
+        [{"id": character_id, "raiderio_score": score, "updated_at": now} for character_id, score in changed.items()]
+    )
+    result = await session.execute(
+        update(Group)
+        .where(Group.id.in_(
+            select(group_players.c.group_id)
+            .join(Character, Character.player_id == group_players.c.player_id)
+            .where(Character.id.in_(list(changed)))
+        ))
+        .values(version=Group.version + 1)
+        .returning(Group.id)
+        .execution_options(synchronize_session=False)
     )
     return result.scalars().all()
 
-async def delete_expired_groups(session: AsyncSession, hours: int):
-    expiry_time = datetime.utcnow() - timedelta(hours=hours)
+async def touch_characters(session: AsyncSession, character_ids):
+    """Mark characters as refreshed without changing their score, so that a
+    failing lookup waits out the usual refresh interval before it is retried."""
+    if not character_ids:
+        return
     await session.execute(
-        delete(Group).where(Group.created_at < expiry_time)
+        update(Character)
+        .where(Character.id.in_(list(character_ids)))
+        .values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+async def get_active_group_state(session: AsyncSession):
+    groups = await session.execute(
+        select(
+            Group.id, Group.dungeon, Group.keystone_level, Group.host_id, Group.guild_id, Group.channel_id,
+            Group.message_id, Group.created_at, Group.expires_at, Group.version
+        )
+    )
+    memberships = await session.execute(
+        select(group_players.c.group_id, Player.id.label("player_id"), Player.discord_id)
+        .join(Player, Player.id == group_players.c.player_id)
+    )
+    return groups.all(), memberships.all()
+
+async def get_character_index_rows(session: AsyncSession):
+    result = await session.execute(
+        select(Player.discord_id, Character.name, Character.realm)
+        .join(Character, Character.player_id == Player.id)
     )
-    await session.commit()
\ No newline at end of file
+    return result.all()
+
+async def get_guild_configs(session: AsyncSession):
+    result = await session.execute(select(GuildConfig))
+    return result.scalars().all()
+
+async def set_guild_config(session: AsyncSession, guild_id: int, **values):
+    config = await session.get(GuildConfig, guild_id)
+    if config is None:
+        config = GuildConfig(guild_id=guild_id)
+        session.add(config)
+    for key, value in values.items():
+        setattr(config, key, value)
+    return config
+
+async def get_bot_state(session: AsyncSession, key: str):
+    state = await session.get(BotState, key)
+    return state.value if state is not None else None
+
+async def set_bot_state(session: AsyncSession, key: str, value: str):
+    await session.merge(BotState(key=key, value=value))
+
+async def get_raiderio_profile(session: AsyncSession, region: str, realm: str, name: str):
+    return await session.get(RaiderIOProfile, (region, realm, name))
+
+async def save_raiderio_profile(session: AsyncSession, **values):
+    await session.merge(RaiderIOProfile(**values))
+
+async def insert_group_events(session: AsyncSession, rows):
+    await session.execute(insert(GroupEvent.__table__), rows)
+
+ROLLUP_WATERMARK_KEY = "group_events_rollup_id"
+ROLLUP_COLUMNS = {
+    "created": "groups_created",
+    "filled": "groups_filled",
+    "expired": "groups_expired",
+    "joined": "joins",
+    "left": "leaves",
+}
+
+async def rollup_group_events(session: AsyncSession, lag_seconds: int):
+    """Fold events past the stored watermark into dungeon_stats. Returns the number of events rolled up."""
+    watermark = int(await get_bot_state(session, ROLLUP_WATERMARK_KEY) or 0)
+    upper = (await session.execute(
+        select(func.max(GroupEvent.id))
+        .where(GroupEvent.id > watermark, GroupEvent.created_at < datetime.utcnow() - timedelta(seconds=lag_seconds))
+    )).scalar()
+    if upper is None:
+        return 0
+
+    result = await session.execute(
+        select(
+            GroupEvent.dungeon, GroupEvent.keystone_level, GroupEvent.event,
+            func.count(), func.coalesce(func.sum(GroupEvent.elapsed_seconds), 0)
+        )
+        .where(GroupEvent.id > watermark, GroupEvent.id <= upper)
+        .group_by(GroupEvent.dungeon, GroupEvent.keystone_level, GroupEvent.event)
+    )
+    rolled_up = 0
+    for dungeon, keystone_level, event, count, elapsed in result.all():
+        rolled_up += count
+        column = ROLLUP_COLUMNS.get(event)
+        if column is None or dungeon is None or keystone_level is None:
+            continue
+        stats = await session.get(DungeonStats, (dungeon, keystone_level))
+        if stats is None:
+            stats = DungeonStats(
+                dungeon=dungeon, keystone_level=keystone_level, groups_created=0, groups_filled=0,
+                groups_expired=0, joins=0, leaves=0, fill_seconds_total=0
+            )
+            session.add(stats)
+        setattr(stats, column, getattr(stats, column) + count)
+        if event == "filled":
+            stats.fill_seconds_total += elapsed
+    # Watermark and counters commit together, so events are never counted twice
+    await session.merge(BotState(key=ROLLUP_WATERMARK_KEY, value=str(upper)))
+    return rolled_up
+
+async def get_dungeon_stats(session: AsyncSession, dungeon: str = None):
+    query = select(DungeonStats)
+    if dungeon is not None:
+        query = query.where(DungeonStats.dungeon == dungeon)
+    result = await session.execute(query.order_by(DungeonStats.dungeon, DungeonStats.keystone_level))
+    return result.scalars().all()
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Dict
+import discord
+from config import EDIT_DEBOUNCE_SECONDS, EDIT_RATE_LIMIT, EDIT_BURST
+from logger import logger
+from ratelimit import TokenBucket
+
+class EditScheduler:
+    """Coalesces edits to the same message and paces them per channel.
+
+    Edits requested within `delay` seconds of each other are merged (last write
+    wins) and sent as a single `message.edit`. Each channel gets its own token
+    bucket, mirroring Discord's per-channel rate limit bucket for message edits.
+    """
+
+    def __init__(self, delay: float = EDIT_DEBOUNCE_SECONDS, rate: float = EDIT_RATE_LIMIT, burst: int = EDIT_BURST):
+        self.delay = delay
+        self.rate = rate
+        self.burst = burst
+        self.pending: Dict[int, tuple] = {}
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.buckets: Dict[int, TokenBucket] = {}
+        self.requested = 0
+        self.sent = 0
+        self.failed = 0
+
+    def schedule(self, message, **kwargs):
+        self.requested += 1
+        entry = self.pending.get(message.id)
+        if entry is None:
+            self.pending[message.id] = (message, dict(kwargs))
+        else:
+            entry[1].update(kwargs)
+
+        if message.id not in self.tasks:
+            self.tasks[message.id] = asyncio.create_task(self._run(message.id))
+
+    def discard(self, message_id: int):
+        """Drop a queued edit that a newer edit has already superseded."""
+        self.pending.pop(message_id, None)
+
+    def stats(self):
+        return {
+            "requested": self.requested,
+            "sent": self.sent,
+            "failed": self.failed,
+            "pending": len(self.pending)
+        }
+
+    async def drain(self):
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks.values()), return_exceptions=True)
+
+    async def _run(self, message_id: int):
+        try:
+            while message_id in self.pending:
+                await asyncio.sleep(self.delay)
+                entry = self.pending.get(message_id)
+                if entry is None:
+                    break
+                await self._bucket(entry[0].channel.id).acquire()
+                # Pop only once a slot is free so anything queued meanwhile rides along
+                entry = self.pending.pop(message_id, None)
+                if entry is None:
+                    break
+                message, kwargs = entry
+                try:
+                    await message.edit(**kwargs)
+                    self.sent += 1
+                except discord.HTTPException as e:
+                    self.failed += 1
+                    logger.warning(f"Failed to edit message {message_id}: {str(e)}")
+        finally:
+            self.tasks.pop(message_id, None)
+
+    def _bucket(self, channel_id: int) -> TokenBucket:
+        bucket = self.buckets.get(channel_id)
+        if bucket is None:
+            bucket = self.buckets[channel_id] = TokenBucket(self.rate, self.burst)
+        return bucket
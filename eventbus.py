@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import socket
+import uuid
+from typing import Awaitable, Callable, List, Optional
+from config import EVENT_BUS, EVENT_BUS_SOCKET_DIR
+from logger import logger
+
+Handler = Callable[[str, dict], Awaitable[None]]
+
+class EventBus:
+    """Broadcasts group-state events to the other bot processes.
+
+    `publish` never delivers to the publishing bus itself; the publisher has
+    already applied the change locally.
+    """
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex
+        self.handlers: List[Handler] = []
+        self.published = 0
+        self.received = 0
+
+    def subscribe(self, handler: Handler):
+        self.handlers.append(handler)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def publish(self, event: str, payload: dict):
+        raise NotImplementedError
+
+    async def _dispatch(self, event: str, payload: dict):
+        self.received += 1
+        for handler in self.handlers:
+            try:
+                await handler(event, payload)
+            except Exception as e:
+                logger.error(f"Error handling {event} event: {str(e)}")
+
+class LocalEventBus(EventBus):
+    """Delivers to the other buses sharing `hub`, i.e. clients in this process."""
+
+    def __init__(self, hub: Optional[list] = None):
+        super().__init__()
+        self.hub = hub if hub is not None else []
+        self.hub.append(self)
+
+    async def publish(self, event: str, payload: dict):
+        self.published += 1
+        for bus in self.hub:
+            if bus is not self:
+                await bus._dispatch(event, payload)
+
+class UnixSocketEventBus(EventBus):
+    """Brokerless bus for processes on one host.
+
+    Every process binds a datagram socket in `directory` and publishing sends a
+    copy of the event to every other socket there. Sockets left behind by dead
+    processes refuse the datagram and are removed.
+    """
+
+    def __init__(self, directory: str = EVENT_BUS_SOCKET_DIR):
+        super().__init__()
+        self.directory = directory
+        self.path = os.path.join(directory, f"{self.node_id}.sock")
+        self.sock: Optional[socket.socket] = None
+        self.dropped = 0
+
+    async def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+        asyncio.get_running_loop().add_reader(self.sock.fileno(), self._on_readable)
+
+    async def close(self):
+        if self.sock is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.sock.fileno())
+        self.sock.close()
+        self.sock = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    async def publish(self, event: str, payload: dict):
+        self.published += 1
+        data = json.dumps({"event": event, "payload": payload}).encode()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".sock") or entry.path == self.path:
+                continue
+            try:
+                self.sock.sendto(data, entry.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+            except BlockingIOError:
+                # The receiver is not keeping up; it resyncs from the database on restart
+                self.dropped += 1
+                logger.warning(f"Event bus dropped {event} event for {entry.name}")
+
+    def _on_readable(self):
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return
+            message = json.loads(data)
+            asyncio.ensure_future(self._dispatch(message["event"], message["payload"]))
+
+def make_event_bus(kind: str = EVENT_BUS) -> EventBus:
+    if kind == "unix":
+        return UnixSocketEventBus()
+    if kind == "local":
+        return LocalEventBus()
+    raise ValueError(f"Unknown EVENT_BUS: {kind}")
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.exc import SQLAlchemyError
+from config import EVENT_LOG_BATCH_SIZE, EVENT_LOG_FLUSH_SECONDS, EVENT_LOG_MAX_PENDING
+from database import insert_group_events, unit_of_work
+from logger import logger
+
+class EventLogWriter:
+    """Buffers group events in memory and writes them in bulk inserts.
+
+    `record` never waits on the database. A background task flushes every
+    `flush_interval` seconds, or sooner once `batch_size` events are pending.
+    If the database falls behind by more than `max_pending` events the oldest
+    ones are dropped.
+    """
+
+    def __init__(self, session_factory, batch_size: int = EVENT_LOG_BATCH_SIZE,
+                 flush_interval: float = EVENT_LOG_FLUSH_SECONDS, max_pending: int = EVENT_LOG_MAX_PENDING):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending: List[dict] = []
+        self.task: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, event: str, group, player_id: int = None, elapsed_seconds: float = None):
+        self.pending.append({
+            "group_id": group.id,
+            "event": event,
+            "player_id": player_id,
+            "guild_id": group.guild_id,
+            "dungeon": group.dungeon,
+            "keystone_level": group.keystone_level,
+            "elapsed_seconds": elapsed_seconds,
+            "created_at": datetime.utcnow()
+        })
+        if len(self.pending) > self.max_pending:
+            overflow = len(self.pending) - self.max_pending
+            del self.pending[:overflow]
+            self.dropped += overflow
+        if len(self.pending) >= self.batch_size and self.wakeup is not None:
+            self.wakeup.set()
+
+    def start(self):
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        while self.pending and await self.flush():
+            pass
+
+    async def flush(self) -> bool:
+        """Write up to one batch; returns False if the write failed."""
+        batch = self.pending[:self.batch_size]
+        if not batch:
+            return True
+        del self.pending[:len(batch)]
+        try:
+            async with unit_of_work(self.session_factory) as session:
+                await insert_group_events(session, batch)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to write {len(batch)} group events: {str(e)}")
+            # Put the batch back in front of anything recorded meanwhile
+            self.pending[:0] = batch
+            return False
+        except asyncio.CancelledError:
+            self.pending[:0] = batch
+            raise
+        self.written += len(batch)
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            while self.pending and await self.flush():
+                if len(self.pending) < self.batch_size:
+                    break
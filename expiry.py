@@ -0,0 +1,79 @@
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from config import GROUP_EXPIRY_HOURS, EXPIRY_BATCH_SIZE
+
+class ExpiryScheduler:
+    """Min-heap of group expiry deadlines (naive UTC, like `Group.created_at`).
+
+    Cancelled or rescheduled groups leave their old heap entry behind; it is
+    skipped when popped because it no longer matches `deadlines`.
+    """
+
+    def __init__(self, ttl: timedelta = timedelta(hours=GROUP_EXPIRY_HOURS), batch_size: int = EXPIRY_BATCH_SIZE):
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.heap: List[tuple] = []
+        self.deadlines: Dict[int, datetime] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def load(self, groups, deadline_for=None):
+        """Rebuild from rows with `id` and `created_at`; `deadline_for(row)` overrides
+        `created_at` plus the default TTL per row."""
+        self.deadlines = {row.id: deadline_for(row) if deadline_for else row.created_at + self.ttl for row in groups}
+        self.heap = [(deadline, group_id) for group_id, deadline in self.deadlines.items()]
+        heapq.heapify(self.heap)
+        self._wake()
+
+    def schedule(self, group_id: int, created_at: datetime, ttl: Optional[timedelta] = None):
+        self.schedule_at(group_id, created_at + (ttl or self.ttl))
+
+    def schedule_at(self, group_id: int, deadline: datetime):
+        earliest = self.heap[0][0] if self.heap else None
+        self.deadlines[group_id] = deadline
+        heapq.heappush(self.heap, (deadline, group_id))
+        if earliest is None or deadline < earliest:
+            self._wake()
+
+    def cancel(self, group_id: int):
+        self.deadlines.pop(group_id, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        self._discard_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: datetime) -> List[int]:
+        """Remove and return up to `batch_size` groups whose deadline has passed."""
+        due = []
+        while len(due) < self.batch_size:
+            self._discard_stale()
+            if not self.heap or self.heap[0][0] > now:
+                break
+            _, group_id = heapq.heappop(self.heap)
+            del self.deadlines[group_id]
+            due.append(group_id)
+        return due
+
+    async def wait(self):
+        """Sleep until the next deadline, or until an earlier one is scheduled."""
+        if self.wakeup is None:
+            self.wakeup = asyncio.Event()
+        self.wakeup.clear()
+        deadline = self.next_deadline()
+        timeout = None if deadline is None else max((deadline - datetime.utcnow()).total_seconds(), 0)
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _wake(self):
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def _discard_stale(self):
+        while self.heap and self.deadlines.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
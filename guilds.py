@@ -0,0 +1,49 @@
+import json
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+from config import SUPPORTED_DUNGEONS, MAX_KEYSTONE_LEVEL, GROUP_EXPIRY_HOURS
+
+class GuildSettings:
+    __slots__ = ("dungeons", "max_keystone_level", "expiry_hours")
+
+    def __init__(self, dungeons: Optional[Tuple[str, ...]] = None, max_keystone_level: Optional[int] = None,
+                 expiry_hours: Optional[int] = None):
+        self.dungeons = tuple(dungeons) if dungeons else tuple(SUPPORTED_DUNGEONS)
+        self.max_keystone_level = max_keystone_level or MAX_KEYSTONE_LEVEL
+        self.expiry_hours = expiry_hours or GROUP_EXPIRY_HOURS
+
+    @property
+    def expiry(self) -> timedelta:
+        return timedelta(hours=self.expiry_hours)
+
+DEFAULT_SETTINGS = GuildSettings()
+
+def guild_config_payload(config) -> dict:
+    """JSON-serialisable form of a `GuildConfig` row."""
+    return {
+        "guild_id": config.guild_id,
+        "dungeons": config.dungeons,
+        "max_keystone_level": config.max_keystone_level,
+        "expiry_hours": config.expiry_hours
+    }
+
+class GuildConfigCache:
+    """Every guild's settings, loaded at startup and written through on change.
+
+    Guilds without a `guild_configs` row share `DEFAULT_SETTINGS`.
+    """
+
+    def __init__(self):
+        self.settings: Dict[int, GuildSettings] = {}
+
+    def load(self, configs):
+        self.settings.clear()
+        for config in configs:
+            self.apply(guild_config_payload(config))
+
+    def apply(self, payload: dict):
+        dungeons = json.loads(payload["dungeons"]) if payload["dungeons"] else None
+        self.settings[payload["guild_id"]] = GuildSettings(dungeons, payload["max_keystone_level"], payload["expiry_hours"])
+
+    def get(self, guild_id: Optional[int]) -> GuildSettings:
+        return self.settings.get(guild_id, DEFAULT_SETTINGS)
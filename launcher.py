@@ -0,0 +1,50 @@
+"""Starts SHARD_COUNT shards split evenly over WORKERS bot processes.
+
+The workers share a Unix socket event bus, so they must run on one host:
+
+    SHARD_COUNT=8 WORKERS=4 python launcher.py
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+from config import SHARD_COUNT
+from logger import logger
+
+def shard_ranges(shard_count: int, workers: int):
+    per_worker, extra = divmod(shard_count, workers)
+    first = 0
+    for worker in range(workers):
+        last = first + per_worker + (1 if worker < extra else 0) - 1
+        if last >= first:
+            yield f"{first}-{last}"
+        first = last + 1
+
+def main():
+    workers = int(os.getenv('WORKERS', '1'))
+    shard_count = SHARD_COUNT or workers
+    procs = []
+    for shard_ids in shard_ranges(shard_count, workers):
+        env = dict(os.environ, SHARD_COUNT=str(shard_count), SHARD_IDS=shard_ids, EVENT_BUS='unix')
+        procs.append(subprocess.Popen([sys.executable, 'main.py'], env=env))
+        logger.info(f"Started worker {procs[-1].pid} for shards {shard_ids}")
+
+    def stop(signum, frame):
+        for proc in procs:
+            if proc.poll() is None:
+                proc.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # If any worker dies take the rest down too, so the process manager restarts everything
+    while all(proc.poll() is None for proc in procs):
+        time.sleep(1)
+    stop(None, None)
+    for proc in procs:
+        proc.wait()
+    sys.exit(max(proc.returncode for proc in procs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable
+
+class KeyedLocks:
+    """One asyncio.Lock per key, dropped again once nobody holds or waits on it."""
+
+    def __init__(self):
+        self.locks: Dict[Hashable, asyncio.Lock] = {}
+        self.users: Dict[Hashable, int] = {}
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable):
+        lock = self.locks.get(key)
+        if lock is None:
+            lock = self.locks[key] = asyncio.Lock()
+        self.users[key] = self.users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self.users[key] -= 1
+            if not self.users[key]:
+                del self.users[key]
+                del self.locks[key]
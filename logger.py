@@ -1,23 +1,107 @@
+import atexit
+import contextvars
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from config import LOG_LEVEL, LOG_FILE, LOG_JSON, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES
+
+# Fields attached to every record logged from the current command or event task
+CONTEXT_FIELDS = ('command', 'guild_id', 'user_id', 'group_id')
+log_context = contextvars.ContextVar('log_context', default={})
+
+def bind_log_context(**fields):
+    """Add fields to the structured context of records logged from this task.
+    Returns the token to pass to `log_context.reset` to undo it."""
+    return log_context.set({**log_context.get(), **fields})
+
+@contextmanager
+def bound_log_context(**fields):
+    """Add fields to the log context for the duration of the block only, for
+    code that runs on a long-lived task such as a background loop."""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        log_context.reset(token)
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, value in log_context.get().items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of records at the levels listed in `rates`."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        if rate is None or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        return json.dumps(entry, default=str)
 
 def setup_logger():
     logger = logging.getLogger('wow_lfg_bot')
-    logger.setLevel(logging.INFO)
+    logger.setLevel(LOG_LEVEL)
 
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if LOG_JSON:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-    file_handler = RotatingFileHandler('wow_lfg_bot.log', maxBytes=10485760, backupCount=5)
-    file_handler.setLevel(logging.INFO)
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10485760, backupCount=5)
     file_handler.setFormatter(formatter)
 
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # File writes and rollovers happen on the listener's thread, never the event loop
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+    sampler = SamplingFilter(LOG_SAMPLE_RATES)
+    queue_handler.addFilter(sampler)
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
 
-    return logger
+    return logger, queue_handler, sampler
 
-logger = setup_logger()
\ No newline at end of file
+logger, log_handler, log_sampler = setup_logger()
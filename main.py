@@ -1,63 +1,317 @@
 import discord
 from discord import app_commands
 import asyncio
-import aiohttp
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import hashlib
+import json
+import time
+import types
+from datetime import datetime, timedelta
 from sqlalchemy.exc import SQLAlchemyError
 from config import (
-    DISCORD_TOKEN, 
-    DATABASE_URL, 
+    DISCORD_TOKEN,
+    DEV_GUILD_ID,
     SUPPORTED_DUNGEONS, 
     MAX_GROUP_SIZE, 
-    GROUP_EXPIRY_HOURS
+    MIN_KEYSTONE_LEVEL,
+    MAX_KEYSTONE_LEVEL,
+    EXPIRY_BATCH_DELAY,
+    SCORE_REFRESH_INTERVAL,
+    GROUP_LIST_PAGE_SIZE,
+    MATCHMAKING_TICK_SECONDS,
+    METRICS_ENABLED,
+    METRICS_HOST,
+    METRICS_PORT,
+    SHARD_COUNT,
+    SHARD_IDS,
+    STATS_ROLLUP_INTERVAL,
+    STATS_ROLLUP_LAG_SECONDS
 )
-from models import Base
 from database import (
+    engine, SessionLocal, unit_of_work,
     get_player, create_player, get_character, create_character,
-    get_group, create_group, add_player_to_group, remove_player_from_group,
-    update_character_score, get_player_groups, update_character, get_all_active_groups,
-    delete_expired_groups
+    get_group, get_groups_for_render, create_group, add_player_to_group, mark_group_filled, remove_player_from_group,
+    get_player_groups, update_character, get_active_groups_page,
+    delete_groups, set_group_message, get_active_group_state,
+    get_player_by_id, get_best_character, get_bot_state, set_bot_state,
+    get_character_index_rows, rollup_group_events, get_dungeon_stats,
+    get_guild_configs, set_guild_config, bump_player_group_versions
 )
-from logger import logger
+from logger import logger, bind_log_context, bound_log_context
+from raiderio import RaiderIOClient
+from profilecache import ProfileCache
+from refresh import refresh_stale_scores
+from edits import EditScheduler
+from cache import GroupStateCache, group_payload
+from autocomplete import CharacterIndex
+from render import EmbedCache
+from eventlog import EventLogWriter
+from guilds import GuildConfigCache, guild_config_payload
+from eventbus import make_event_bus
+from locks import KeyedLocks
+from expiry import ExpiryScheduler
+from matchmaking import MatchmakingEngine, QueueEntry, ROLES
+from metrics import COMMAND_LATENCY, FOLLOWUP_LATENCY, instrument_discord, instrument_edits, start_metrics_server
 
-# Database setup
-engine = create_engine(DATABASE_URL, echo=True, future=True)
-SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+class InstrumentedCommandTree(app_commands.CommandTree):
+    """Command tree that times every command it dispatches."""
 
-class LFGBot(discord.Client):
-    def __init__(self):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        interaction.extras['started_at'] = time.perf_counter()
+        bind_log_context(
+            command=interaction.command.name if interaction.command else None,
+            guild_id=interaction.guild_id,
+            user_id=interaction.user.id
+        )
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        observe_command(interaction, "error")
+        await super().on_error(interaction, error)
+
+def command_tree_hash(commands) -> str:
+    """Stable hash of the command payloads Discord would receive on sync."""
+    payload = sorted((command.to_dict() for command in commands), key=lambda command: command['name'])
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+class LFGBot(discord.AutoShardedClient):
+    """Runs the shards in `SHARD_IDS` (all of them by default).
+
+    Several processes can split the shards between them; group changes are
+    broadcast over `bus` so every process keeps the same group cache, while
+    only the process owning a guild's shard edits its posts and expires its
+    groups.
+    """
+
+    def __init__(self, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS, bus=None):
         intents = discord.Intents.default()
         intents.message_content = True
-        intents.reactions = True
-        super().__init__(intents=intents)
-        self.tree = app_commands.CommandTree(self)
+        # Group post buttons are routed by custom_id, so no message cache is needed
+        super().__init__(intents=intents, max_messages=None, shard_count=shard_count, shard_ids=shard_ids)
+        self.bus = bus or make_event_bus()
+        self.bus.subscribe(self.on_bus_event)
+        self.tree = InstrumentedCommandTree(self)
+        self.raiderio = RaiderIOClient(cache=ProfileCache(SessionLocal))
+        self.edits = EditScheduler()
+        self.groups = GroupStateCache()
+        self.characters = CharacterIndex()
+        self.embeds = EmbedCache()
+        self.guild_configs = GuildConfigCache()
+        self.group_locks = KeyedLocks()
+        self.matchmaking = MatchmakingEngine()
+        self.expiry = ExpiryScheduler()
+        self.event_log = EventLogWriter(SessionLocal)
+        self.metrics_runner = None
+        self.launched_at = time.perf_counter()
+        self.ready_at = None
 
     async def setup_hook(self):
-        Base.metadata.create_all(bind=engine)
-        await self.tree.sync()
-        self.bg_task = self.loop.create_task(self.background_task())
+        phases = []
+        started = time.perf_counter()
+
+        def phase(name):
+            nonlocal started
+            now = time.perf_counter()
+            phases.append(f"{name}={(now - started) * 1000:.0f}ms")
+            started = now
+
+        if METRICS_ENABLED:
+            instrument_discord()
+            instrument_edits(self.edits)
+            self.metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+            phase("metrics")
+        await self.raiderio.start()
+        await self.bus.start()
+        self.event_log.start()
+        phase("clients")
+        async with SessionLocal() as session:
+            groups, memberships = await get_active_group_state(session)
+            self.characters.load(await get_character_index_rows(session))
+            self.guild_configs.load(await get_guild_configs(session))
+        self.groups.load(groups, memberships)
+        self.expiry.load(
+            (row for row in groups if self.owns_guild(row.guild_id)),
+            deadline_for=lambda row: self.group_deadline(row.guild_id, row.created_at, row.expires_at)
+        )
+        phase("cache")
+        self.expiry_task = self.loop.create_task(self.expire_groups())
+        # Work that must only happen once per deployment runs in the process holding shard 0
+        if self.owns_guild(None):
+            await self.sync_commands()
+            phase("command_sync")
+            self.refresh_task = self.loop.create_task(self.score_refresh_task())
+            self.rollup_task = self.loop.create_task(self.stats_rollup_task())
+        self.matchmaking_task = self.loop.create_task(self.matchmaking_loop())
+        logger.info(f"Setup finished: {', '.join(phases)}")
+
+    async def sync_commands(self):
+        """Sync the command tree, skipping the (slow, heavily rate limited) sync if
+        nothing changed since the last one. With DEV_GUILD_ID set, commands are
+        synced to that guild only."""
+        guild = discord.Object(id=DEV_GUILD_ID) if DEV_GUILD_ID else None
+        if guild is not None:
+            self.tree.copy_global_to(guild=guild)
+        digest = command_tree_hash(self.tree.get_commands(guild=guild))
+        key = f"command_tree_hash:{DEV_GUILD_ID or 'global'}"
+        async with SessionLocal() as session:
+            if await get_bot_state(session, key) == digest:
+                logger.info("Command tree unchanged, skipping sync")
+                return
+        await self.tree.sync(guild=guild)
+        async with unit_of_work() as session:
+            await set_bot_state(session, key, digest)
+        logger.info(f"Synced command tree ({digest[:12]})")
+
+    async def close(self):
+        await self.edits.drain()
+        await super().close()
+        await self.event_log.close()
+        await self.raiderio.close()
+        await self.bus.close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        await engine.dispose()
 
     async def on_ready(self):
         logger.info(f'Logged in as {self.user} (ID: {self.user.id})')
+        if self.ready_at is None:
+            self.ready_at = time.perf_counter()
+            logger.info(f"Ready {self.ready_at - self.launched_at:.2f}s after launch")
+
+    def owns_guild(self, guild_id) -> bool:
+        """Whether this process runs the shard for `guild_id` (shard 0 for groups without one)."""
+        if self.shard_ids is None:
+            return True
+        shard_id = (guild_id >> 22) % self.shard_count if guild_id is not None else 0
+        return shard_id in self.shard_ids
 
-    async def background_task(self):
+    async def on_bus_event(self, event: str, payload: dict):
+        # Apply to the cache before the first await so events are applied in arrival order
+        if event == "group_changed":
+            self.groups.apply(payload)
+            if not self.owns_guild(payload["guild_id"]):
+                return
+            if payload["created_at"] is not None and payload["id"] not in self.expiry.deadlines:
+                expires_at = payload.get("expires_at")
+                self.expiry.schedule_at(payload["id"], self.group_deadline(
+                    payload["guild_id"], datetime.fromisoformat(payload["created_at"]),
+                    datetime.fromisoformat(expires_at) if expires_at else None
+                ))
+            if self.embeds.is_sent(payload["id"], payload["version"]):
+                return
+            async with SessionLocal() as session:
+                group = await get_group(session, payload["id"])
+            if group is not None:
+                await refresh_group_message(group)
+        elif event == "guild_config_changed":
+            self.guild_configs.apply(payload)
+        elif event == "character_linked":
+            self.characters.add(payload["discord_id"], payload["name"], payload["realm"])
+        elif event == "group_closed":
+            self.groups.remove_group(payload["id"])
+            self.expiry.cancel(payload["id"])
+            self.matchmaking.forget_group(payload["id"])
+            await close_group_message(types.SimpleNamespace(**payload), payload["reason"])
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        observe_command(interaction, "ok")
+
+    def group_deadline(self, guild_id, created_at, expires_at):
+        """When a group expires: its stored `expires_at`, or for groups created
+        before that was stored, `created_at` plus the guild's current expiry."""
+        return expires_at or created_at + self.guild_configs.get(guild_id).expiry
+
+    def new_group_expiry(self, guild_id):
+        return datetime.utcnow() + self.guild_configs.get(guild_id).expiry
+
+    async def expire_groups(self):
         await self.wait_until_ready()
         while not self.is_closed():
-            with SessionLocal() as session:
-                delete_expired_groups(session, hours=GROUP_EXPIRY_HOURS)
-            await asyncio.sleep(3600)  # Run every hour
+            await self.expiry.wait()
+            group_ids = self.expiry.pop_due(datetime.utcnow())
+            while group_ids:
+                try:
+                    async with unit_of_work() as session:
+                        expired = await delete_groups(session, group_ids)
+                except SQLAlchemyError as e:
+                    logger.error(f"Database error expiring groups: {str(e)}")
+                    retry_at = datetime.utcnow() + timedelta(seconds=60)
+                    for group_id in group_ids:
+                        self.expiry.schedule_at(group_id, retry_at)
+                    break
+                now = datetime.utcnow()
+                for group in expired:
+                    self.event_log.record("expired", group, elapsed_seconds=(now - group.created_at).total_seconds())
+                    self.groups.remove_group(group.id)
+                    self.matchmaking.forget_group(group.id)
+                    await close_group_message(group, "This group has expired.")
+                    await publish_group_closed(group, "This group has expired.")
+                # Spread a backlog (e.g. after downtime) over several small batches
+                group_ids = self.expiry.pop_due(datetime.utcnow())
+                if group_ids:
+                    await asyncio.sleep(EXPIRY_BATCH_DELAY)
+
+    async def stats_rollup_task(self):
+        await self.wait_until_ready()
+        while not self.is_closed():
+            try:
+                async with unit_of_work() as session:
+                    rolled_up = await rollup_group_events(session, STATS_ROLLUP_LAG_SECONDS)
+                if rolled_up:
+                    logger.info(f"Rolled up {rolled_up} group events")
+            except SQLAlchemyError as e:
+                logger.error(f"Database error in stats rollup: {str(e)}")
+            await asyncio.sleep(STATS_ROLLUP_INTERVAL)
+
+    async def score_refresh_task(self):
+        await self.wait_until_ready()
+        while not self.is_closed():
+            try:
+                stats = await refresh_stale_scores(SessionLocal, self.raiderio)
+                if stats["changed_groups"]:
+                    await self.refresh_groups(stats["changed_groups"])
+            except Exception as e:
+                logger.error(f"Error in score refresh: {str(e)}")
+            await asyncio.sleep(SCORE_REFRESH_INTERVAL)
+
+    async def refresh_groups(self, group_ids):
+        """Write through and re-render groups changed outside a join/leave, e.g. by a score refresh."""
+        async with SessionLocal() as session:
+            groups = await get_groups_for_render(session, list(group_ids))
+        for group in groups:
+            self.groups.sync_group(group)
+            await refresh_group_message(group)
+            await publish_group_changed(group)
+
+    async def matchmaking_loop(self):
+        await self.wait_until_ready()
+        while not self.is_closed():
+            if len(self.matchmaking):
+                try:
+                    open_groups = [state for guild_id in self.matchmaking.guilds() for state in self.groups.open_groups(guild_id)]
+                    joins, formed = self.matchmaking.tick(open_groups)
+                    await apply_matches(joins, formed)
+                except Exception as e:
+                    logger.error(f"Error in matchmaking: {str(e)}")
+            await asyncio.sleep(MATCHMAKING_TICK_SECONDS)
 
 client = LFGBot()
 
-async def get_raiderio_score(name: str, realm: str, region: str = 'us'):
-    async with aiohttp.ClientSession() as session:
-        url = f"https://raider.io/api/v1/characters/profile?region={region}&realm={realm}&name={name}&fields=mythic_plus_scores_by_season:current"
-        async with session.get(url) as response:
-            if response.status == 200:
-                data = await response.json()
-                return int(data['mythic_plus_scores_by_season'][0]['scores']['all'])
-            return None
+def observe_command(interaction: discord.Interaction, status: str):
+    finished = time.perf_counter()
+    name = interaction.command.name if interaction.command else "unknown"
+    started = interaction.extras.get('started_at')
+    if started is not None:
+        COMMAND_LATENCY.observe(finished - started, command=name, status=status)
+    deferred = interaction.extras.get('deferred_at')
+    if deferred is not None:
+        FOLLOWUP_LATENCY.observe(finished - deferred, command=name)
+
+async def defer(interaction: discord.Interaction):
+    interaction.extras['deferred_at'] = time.perf_counter()
+    await interaction.response.defer(ephemeral=True)
+
+async def get_raiderio_score(name: str, realm: str, region: str = 'us', allow_stale: bool = True):
+    return await client.raiderio.get_score(name, realm, region, allow_stale=allow_stale)
 
 @client.tree.command(name="link_character", description="Link your WoW character to your Discord account")
 @app_commands.describe(
@@ -67,28 +321,35 @@ async def get_raiderio_score(name: str, realm: str, region: str = 'us'):
     item_level="Your character's item level"
 )
 async def link_character(interaction: discord.Interaction, name: str, realm: str, class_name: str, item_level: int):
-    await interaction.response.defer(ephemeral=True)
+    await defer(interaction)
     
     try:
-        with SessionLocal() as session:
-            player = get_player(session, interaction.user.id)
-            if not player:
-                player = create_player(session, interaction.user.id, f"{interaction.user.name}#{interaction.user.discriminator}")
-            
-            existing_character = get_character(session, player.id, name, realm)
-            if existing_character:
-                await interaction.followup.send(f"Character {name}-{realm} is already linked to your account!", ephemeral=True)
-                return
+        async with SessionLocal() as session:
+            player = await get_player(session, interaction.user.id)
+            existing_character = await get_character(session, player.id, name, realm) if player else None
+        if existing_character:
+            await interaction.followup.send(f"Character {name}-{realm} is already linked to your account!", ephemeral=True)
+            return
 
-            raiderio_score = await get_raiderio_score(name, realm)
-            if raiderio_score is None:
-                await interaction.followup.send(f"Unable to fetch Raider.IO score for {name}-{realm}. Please check the character name and realm.", ephemeral=True)
-                return
+        raiderio_score = await get_raiderio_score(name, realm)
+        if raiderio_score is None:
+            await interaction.followup.send(f"Unable to fetch Raider.IO score for {name}-{realm}. Please check the character name and realm.", ephemeral=True)
+            return
 
-            character = create_character(session, player.id, name, realm, class_name, item_level)
-            update_character_score(session, character, raiderio_score)
+        state = client.groups.group_of(player.id) if player else None
+        async with unit_of_work() as session:
+            if not player:
+                player = await create_player(session, interaction.user.id, f"{interaction.user.name}#{interaction.user.discriminator}")
+            await create_character(session, player.id, name, realm, class_name, item_level, raiderio_score)
+            if state is not None:
+                await bump_player_group_versions(session, [player.id])
+        client.groups.remember_player(player.discord_id, player.id)
+        client.characters.add(interaction.user.id, name, realm)
+        await client.bus.publish("character_linked", {"discord_id": interaction.user.id, "name": name, "realm": realm})
+        if state is not None:
+            await client.refresh_groups([state.id])
 
-            await interaction.followup.send(f"Character {name}-{realm} linked successfully! Raider.IO Score: {raiderio_score}", ephemeral=True)
+        await interaction.followup.send(f"Character {name}-{realm} linked successfully! Raider.IO Score: {raiderio_score}", ephemeral=True)
     except SQLAlchemyError as e:
         logger.error(f"Database error in link_character: {str(e)}")
         await interaction.followup.send("An error occurred while linking your character. Please try again later.", ephemeral=True)
@@ -103,78 +364,75 @@ async def link_character(interaction: discord.Interaction, name: str, realm: str
     app_commands.Choice(name=dungeon, value=dungeon) for dungeon in SUPPORTED_DUNGEONS
 ])
 async def lfg(interaction: discord.Interaction, dungeon: str, keystone_level: int, note: str = None):
-    await interaction.response.defer(ephemeral=True)
+    await defer(interaction)
     
-    try:
-        with SessionLocal() as session:
-            player = get_player(session, interaction.user.id)
-            if not player:
-                await interaction.followup.send("You need to link a character first. Use the /link_character command.", ephemeral=True)
-                return
-
-            player_groups = get_player_groups(session, player.id)
-            if player_groups:
-                await interaction.followup.send("You're already in a group. Leave it first to create a new one.", ephemeral=True)
-                return
-
-            if keystone_level < 2 or keystone_level > 30:
-                await interaction.followup.send("Invalid keystone level. Please choose a level between 2 and 30.", ephemeral=True)
-                return
+    player_id = client.groups.player_id_for(interaction.user.id)
+    if player_id is not None and client.groups.group_of(player_id) is not None:
+        await interaction.followup.send("You're already in a group. Leave it first to create a new one.", ephemeral=True)
+        return
 
-            group = create_group(session, player, dungeon, keystone_level, note)
+    settings = client.guild_configs.get(interaction.guild_id)
+    if dungeon not in settings.dungeons:
+        await interaction.followup.send(f"{dungeon} is not enabled on this server.", ephemeral=True)
+        return
+    if keystone_level < MIN_KEYSTONE_LEVEL or keystone_level > settings.max_keystone_level:
+        await interaction.followup.send(f"Invalid keystone level. Please choose a level between {MIN_KEYSTONE_LEVEL} and {settings.max_keystone_level}.", ephemeral=True)
+        return
 
-            embed = create_group_embed(group)
-            message = await interaction.channel.send(embed=embed)
-            await message.add_reaction("✅")  # Join
-            await message.add_reaction("❌")  # Leave
+    try:
+        async with unit_of_work() as session:
+            player = await get_player(session, interaction.user.id)
+            group = await create_group(
+                session, player, dungeon, keystone_level, note, interaction.guild_id,
+                client.new_group_expiry(interaction.guild_id)
+            ) if player else None
+        if not player:
+            await interaction.followup.send("You need to link a character first. Use the /link_character command.", ephemeral=True)
+            return
+        client.groups.remember_player(player.discord_id, player.id)
 
-            await interaction.followup.send(f"Group created with ID: {group.id}", ephemeral=True)
+        if await post_group(group, interaction.channel, interaction.guild_id) is None:
+            await interaction.followup.send("I couldn't post the group in this channel. Please check my permissions here and try again.", ephemeral=True)
+            return
+        await interaction.followup.send(f"Group created with ID: {group.id}", ephemeral=True)
     except SQLAlchemyError as e:
         logger.error(f"Database error in lfg: {str(e)}")
         await interaction.followup.send("An error occurred while creating the group. Please try again later.", ephemeral=True)
 
 @client.tree.command(name="leave", description="Leave your current group")
 async def leave(interaction: discord.Interaction):
-    await interaction.response.defer(ephemeral=True)
+    await defer(interaction)
     
-    try:
-        with SessionLocal() as session:
-            player = get_player(session, interaction.user.id)
-            if not player:
-                await interaction.followup.send("You're not in any group.", ephemeral=True)
-                return
-
-            player_groups = get_player_groups(session, player.id)
-            if not player_groups:
-                await interaction.followup.send("You're not in any group.", ephemeral=True)
-                return
-
-            group = player_groups[0]  # Assume a player can only be in one group at a time
-            remove_player_from_group(session, group, player)
+    player_id = client.groups.player_id_for(interaction.user.id)
+    state = client.groups.group_of(player_id) if player_id is not None else None
+    if state is None:
+        await interaction.followup.send("You're not in any group.", ephemeral=True)
+        return
 
-            if group.id:
-                embed = create_group_embed(group)
-                # In a real implementation, you'd need to find and edit the original message
-                # await message.edit(embed=embed)
-                await interaction.followup.send("You've left the group.", ephemeral=True)
-            else:
-                await interaction.followup.send("You've left the group. The group has been disbanded as it's now empty.", ephemeral=True)
+    try:
+        remaining = await leave_group(state, player_id)
+        if remaining is None:
+            await interaction.followup.send("You're not in any group.", ephemeral=True)
+        elif remaining:
+            await interaction.followup.send("You've left the group.", ephemeral=True)
+        else:
+            await interaction.followup.send("You've left the group. The group has been disbanded as it's now empty.", ephemeral=True)
     except SQLAlchemyError as e:
         logger.error(f"Database error in leave: {str(e)}")
         await interaction.followup.send("An error occurred while leaving the group. Please try again later.", ephemeral=True)
 
 @client.tree.command(name="my_groups", description="Show the groups you're currently in")
 async def my_groups(interaction: discord.Interaction):
-    await interaction.response.defer(ephemeral=True)
+    await defer(interaction)
     
     try:
-        with SessionLocal() as session:
-            player = get_player(session, interaction.user.id)
+        async with SessionLocal() as session:
+            player = await get_player(session, interaction.user.id)
             if not player:
                 await interaction.followup.send("You haven't linked any characters yet. Use the /link_character command first.", ephemeral=True)
                 return
 
-            player_groups = get_player_groups(session, player.id)
+            player_groups = await get_player_groups(session, player.id)
             if not player_groups:
                 await interaction.followup.send("You're not currently in any groups.", ephemeral=True)
                 return
@@ -183,7 +441,7 @@ async def my_groups(interaction: discord.Interaction):
             for group in player_groups:
                 embed.add_field(
                     name=f"{group.dungeon} +{group.keystone_level}",
-                    value=f"Status: {'Filled' if len(group.players) >= MAX_GROUP_SIZE else f'{len(group.players)}/{MAX_GROUP_SIZE}'}\nGroup ID: {group.id}",
+                    value=f"Status: {'Filled' if group.member_count >= MAX_GROUP_SIZE else f'{group.member_count}/{MAX_GROUP_SIZE}'}\nGroup ID: {group.id}",
                     inline=False
                 )
 
@@ -200,27 +458,33 @@ async def my_groups(interaction: discord.Interaction):
     item_level="Your character's item level"
 )
 async def update_character_cmd(interaction: discord.Interaction, name: str, realm: str, class_name: str, item_level: int):
-    await interaction.response.defer(ephemeral=True)
+    await defer(interaction)
     
     try:
-        with SessionLocal() as session:
-            player = get_player(session, interaction.user.id)
-            if not player:
-                await interaction.followup.send("You haven't linked any characters yet. Use the /link_character command first.", ephemeral=True)
-                return
+        async with SessionLocal() as session:
+            player = await get_player(session, interaction.user.id)
+            character = await get_character(session, player.id, name, realm) if player else None
+        if not player:
+            await interaction.followup.send("You haven't linked any characters yet. Use the /link_character command first.", ephemeral=True)
+            return
+        if not character:
+            await interaction.followup.send(f"Character {name}-{realm} is not linked to your account. Use /link_character to link it first.", ephemeral=True)
+            return
 
-            character = get_character(session, player.id, name, realm)
-            if not character:
-                await interaction.followup.send(f"Character {name}-{realm} is not linked to your account. Use /link_character to link it first.", ephemeral=True)
-                return
-
-            raiderio_score = await get_raiderio_score(name, realm)
-            if raiderio_score is None:
-                await interaction.followup.send(f"Unable to fetch Raider.IO score for {name}-{realm}. Character information not updated.", ephemeral=True)
-                return
+        # This is the explicit "refresh my score" command, so never answer from a stale cache entry
+        raiderio_score = await get_raiderio_score(name, realm, allow_stale=False)
+        if raiderio_score is None:
+            await interaction.followup.send(f"Unable to fetch Raider.IO score for {name}-{realm}. Character information not updated.", ephemeral=True)
+            return
 
-            update_character(session, character, class_name, item_level, raiderio_score)
-            await interaction.followup.send(f"Character {name}-{realm} updated successfully! New Raider.IO Score: {raiderio_score}", ephemeral=True)
+        state = client.groups.group_of(player.id)
+        async with unit_of_work() as session:
+            await update_character(session, character.id, class_name, item_level, raiderio_score)
+            if state is not None:
+                await bump_player_group_versions(session, [player.id])
+        if state is not None:
+            await client.refresh_groups([state.id])
+        await interaction.followup.send(f"Character {name}-{realm} updated successfully! New Raider.IO Score: {raiderio_score}", ephemeral=True)
     except SQLAlchemyError as e:
         logger.error(f"Database error in update_character: {str(e)}")
         await interaction.followup.send("An error occurred while updating your character. Please try again later.", ephemeral=True)
@@ -228,45 +492,351 @@ async def update_character_cmd(interaction: discord.Interaction, name: str, real
 @client.tree.command(name="group_info", description="View detailed information about a specific group")
 @app_commands.describe(group_id="The ID of the group you want to view")
 async def group_info(interaction: discord.Interaction, group_id: int):
-    await interaction.response.defer(ephemeral=True)
+    await defer(interaction)
     
+    # An unchanged group's embed is served straight from the render cache
+    state = client.groups.groups.get(group_id)
+    if state is not None and state.guild_id == interaction.guild_id:
+        embed = client.embeds.get(group_id, state.version)
+        if embed is not None:
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            return
+
     try:
-        with SessionLocal() as session:
-            group = get_group(session, group_id)
-            if not group:
+        async with SessionLocal() as session:
+            group = await get_group(session, group_id)
+            if not group or group.guild_id != interaction.guild_id:
                 await interaction.followup.send("Group not found. It may have been disbanded or expired.", ephemeral=True)
                 return
 
-            embed = create_group_embed(group)
+            embed = group_embed(group)
             await interaction.followup.send(embed=embed, ephemeral=True)
     except SQLAlchemyError as e:
         logger.error(f"Database error in group_info: {str(e)}")
         await interaction.followup.send("An error occurred while fetching group information. Please try again later.", ephemeral=True)
 
-@client.tree.command(name="list_groups", description="List all active groups")
-async def list_groups(interaction: discord.Interaction):
-    await interaction.response.defer(ephemeral=True)
-    
+@link_character.autocomplete("realm")
+@update_character_cmd.autocomplete("realm")
+async def realm_autocomplete(interaction: discord.Interaction, current: str):
+    name = getattr(interaction.namespace, "name", None)
+    if interaction.command is update_character_cmd and name:
+        realms = [realm for _, realm in client.characters.characters_of(interaction.user.id, name)
+                  if realm.casefold().startswith(current.casefold())]
+        if realms:
+            return [app_commands.Choice(name=realm, value=realm) for realm in realms]
+    return [app_commands.Choice(name=realm, value=realm) for realm in client.characters.realms.search(current)]
+
+@update_character_cmd.autocomplete("name")
+async def character_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        app_commands.Choice(name=f"{name}-{realm}", value=name)
+        for name, realm in client.characters.characters_of(interaction.user.id, current)
+    ]
+
+@group_info.autocomplete("group_id")
+async def group_id_autocomplete(interaction: discord.Interaction, current):
+    return [
+        app_commands.Choice(
+            name=f"#{state.id} {state.dungeon} +{state.keystone_level} ({len(state.members)}/{MAX_GROUP_SIZE})",
+            value=state.id
+        )
+        for state in client.groups.search(interaction.guild_id, str(current or ""))
+    ]
+
+@client.tree.command(name="queue", description="Queue up to be matched into a Mythic+ group automatically")
+@app_commands.describe(
+    role="The role you want to play",
+    min_level="Lowest keystone level you want to run",
+    max_level="Highest keystone level you want to run",
+    dungeon="Only match into this dungeon (any dungeon if empty)"
+)
+@app_commands.choices(
+    role=[app_commands.Choice(name=role.capitalize(), value=role) for role in ROLES],
+    dungeon=[app_commands.Choice(name=dungeon, value=dungeon) for dungeon in SUPPORTED_DUNGEONS]
+)
+async def queue(interaction: discord.Interaction, role: str, min_level: int, max_level: int, dungeon: str = None):
+    await defer(interaction)
+
+    settings = client.guild_configs.get(interaction.guild_id)
+    if min_level < MIN_KEYSTONE_LEVEL or max_level > settings.max_keystone_level or min_level > max_level:
+        await interaction.followup.send(f"Invalid keystone range. Please choose levels between {MIN_KEYSTONE_LEVEL} and {settings.max_keystone_level}.", ephemeral=True)
+        return
+    if dungeon is not None and dungeon not in settings.dungeons:
+        await interaction.followup.send(f"{dungeon} is not enabled on this server.", ephemeral=True)
+        return
+
+    player_id = client.groups.player_id_for(interaction.user.id)
+    if player_id is not None and client.groups.group_of(player_id) is not None:
+        await interaction.followup.send("You're already in a group. Leave it first to queue.", ephemeral=True)
+        return
+
     try:
-        with SessionLocal() as session:
-            active_groups = get_all_active_groups(session)
-            if not active_groups:
-                await interaction.followup.send("There are no active groups at the moment.", ephemeral=True)
+        async with SessionLocal() as session:
+            player = await get_player(session, interaction.user.id)
+            character = await get_best_character(session, player.id) if player else None
+            if not character:
+                await interaction.followup.send("You need to link a character first. Use the /link_character command.", ephemeral=True)
                 return
+            client.groups.remember_player(player.discord_id, player.id)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error in queue: {str(e)}")
+        await interaction.followup.send("An error occurred while joining the queue. Please try again later.", ephemeral=True)
+        return
 
-            embed = discord.Embed(title="Active Groups", color=discord.Color.blue())
-            for group in active_groups:
-                embed.add_field(
-                    name=f"{group.dungeon} +{group.keystone_level}",
-                    value=f"Status: {len(group.players)}/{MAX_GROUP_SIZE}\nGroup ID: {group.id}",
-                    inline=False
+    client.matchmaking.enqueue(QueueEntry(
+        discord_id=interaction.user.id,
+        player_id=player.id,
+        role=role,
+        score=character.raiderio_score,
+        item_level=character.item_level,
+        dungeons=[dungeon] if dungeon else settings.dungeons,
+        min_level=min_level,
+        max_level=max_level,
+        guild_id=interaction.guild_id,
+        channel_id=interaction.channel_id
+    ))
+    await interaction.followup.send(
+        f"Queued as {role} for {dungeon or 'any dungeon'} +{min_level}-{max_level} with {character.name}-{character.realm}. "
+        f"You'll be placed into a group automatically.", ephemeral=True
+    )
+
+@client.tree.command(name="leave_queue", description="Leave the matchmaking queue")
+async def leave_queue(interaction: discord.Interaction):
+    if client.matchmaking.dequeue(interaction.user.id):
+        await interaction.response.send_message("You've left the queue.", ephemeral=True)
+    else:
+        await interaction.response.send_message("You're not in the queue.", ephemeral=True)
+
+def requeue_unmatched(entries):
+    """Put players whose match couldn't be persisted back in the queue,
+    unless they have found a group by hand meanwhile."""
+    for entry in entries:
+        if client.groups.group_of(entry.player_id) is None:
+            client.matchmaking.requeue(entry)
+
+async def join_matched(group_id, entry):
+    if await join_group(group_id, entry.player_id) is None:
+        requeue_unmatched([entry])
+    else:
+        client.matchmaking.assign(group_id, entry)
+
+async def apply_matches(joins, formed):
+    """Persist a matchmaking tick through the normal create/join paths."""
+    for group_id, entries in joins:
+        for entry in entries:
+            await join_matched(group_id, entry)
+
+    for dungeon, keystone_level, entries in formed:
+        host_entry = entries[0]
+        try:
+            async with unit_of_work() as session:
+                host = await get_player_by_id(session, host_entry.player_id)
+                group = await create_group(
+                    session, host, dungeon, keystone_level, "Formed by the matchmaking queue.", host_entry.guild_id,
+                    client.new_group_expiry(host_entry.guild_id)
                 )
+        except SQLAlchemyError as e:
+            # Most likely the host joined a group by hand since queueing
+            logger.warning(f"Matchmaking could not create a group for {host_entry.discord_id}: {str(e)}")
+            requeue_unmatched(entries)
+            continue
 
-            await interaction.followup.send(embed=embed, ephemeral=True)
+        channel = client.get_partial_messageable(host_entry.channel_id)
+        if await post_group(group, channel, host_entry.guild_id) is None:
+            requeue_unmatched(entries)
+            continue
+        client.matchmaking.assign(group.id, host_entry)
+        for entry in entries[1:]:
+            await join_matched(group.id, entry)
+
+class GroupListView(discord.ui.View):
+    """Previous/Next pager over `get_active_groups_page` keyset cursors."""
+
+    def __init__(self, user_id, filters):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.filters = filters
+        self.cursors = [None]  # cursor that produced each page seen so far
+        self.next_cursor = None
+
+    async def load(self):
+        async with SessionLocal() as session:
+            rows, has_more = await get_active_groups_page(
+                session, limit=GROUP_LIST_PAGE_SIZE, after=self.cursors[-1], **self.filters
+            )
+        self.next_cursor = (rows[-1].created_at, rows[-1].id) if rows and has_more else None
+        self.previous_page.disabled = len(self.cursors) == 1
+        self.next_page.disabled = self.next_cursor is None
+        return rows
+
+    def render(self, rows):
+        embed = discord.Embed(title="Active Groups", color=discord.Color.blue())
+        for group in rows:
+            embed.add_field(
+                name=f"{group.dungeon} +{group.keystone_level}",
+                value=f"Status: {group.member_count}/{MAX_GROUP_SIZE}\nGroup ID: {group.id}",
+                inline=False
+            )
+        embed.set_footer(text=f"Page {len(self.cursors)}")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.user_id
+
+    async def show(self, interaction: discord.Interaction):
+        try:
+            rows = await self.load()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in list_groups: {str(e)}")
+            await interaction.response.send_message("An error occurred while fetching active groups. Please try again later.", ephemeral=True)
+            return
+        await interaction.response.edit_message(embed=self.render(rows), view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.show(interaction)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.primary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.next_cursor is not None:
+            self.cursors.append(self.next_cursor)
+        await self.show(interaction)
+
+@client.tree.command(name="list_groups", description="List active groups")
+@app_commands.describe(
+    dungeon="Only show groups for this dungeon",
+    min_level="Minimum keystone level",
+    max_level="Maximum keystone level",
+    min_score="Minimum Raider.IO score of the group's host",
+    open_slots="Minimum number of open slots",
+    channel="Only show groups posted in this channel"
+)
+@app_commands.choices(dungeon=[
+    app_commands.Choice(name=dungeon, value=dungeon) for dungeon in SUPPORTED_DUNGEONS
+])
+async def list_groups(interaction: discord.Interaction, dungeon: str = None, min_level: int = None, max_level: int = None,
+                      min_score: int = None, open_slots: app_commands.Range[int, 1, MAX_GROUP_SIZE - 1] = None,
+                      channel: discord.TextChannel = None):
+    await defer(interaction)
+    
+    filters = {
+        "guild_id": interaction.guild_id,
+        "channel_id": channel.id if channel else None,
+        "dungeon": dungeon,
+        "min_level": min_level,
+        "max_level": max_level,
+        "min_score": min_score,
+        "open_slots": open_slots
+    }
+    try:
+        view = GroupListView(interaction.user.id, filters)
+        rows = await view.load()
+        if not rows:
+            await interaction.followup.send("There are no active groups matching your filters at the moment.", ephemeral=True)
+            return
+
+        await interaction.followup.send(embed=view.render(rows), view=view, ephemeral=True)
     except SQLAlchemyError as e:
         logger.error(f"Database error in list_groups: {str(e)}")
         await interaction.followup.send("An error occurred while fetching active groups. Please try again later.", ephemeral=True)
 
+@client.tree.command(name="configure", description="Configure the LFG bot for this server")
+@app_commands.describe(
+    dungeon="Dungeon to enable or disable",
+    enabled="Whether the dungeon can be used on this server",
+    max_keystone_level="Highest keystone level groups may be created for",
+    expiry_hours="How long groups stay open before they expire (applies to new groups)"
+)
+@app_commands.choices(dungeon=[
+    app_commands.Choice(name=dungeon, value=dungeon) for dungeon in SUPPORTED_DUNGEONS
+])
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+async def configure(interaction: discord.Interaction, dungeon: str = None, enabled: bool = None,
+                    max_keystone_level: app_commands.Range[int, MIN_KEYSTONE_LEVEL, MAX_KEYSTONE_LEVEL] = None,
+                    expiry_hours: app_commands.Range[int, 1, 168] = None):
+    await defer(interaction)
+
+    settings = client.guild_configs.get(interaction.guild_id)
+    values = {}
+    if dungeon is not None and enabled is not None:
+        dungeons = [name for name in settings.dungeons if name != dungeon]
+        if enabled:
+            dungeons.append(dungeon)
+        if not dungeons:
+            await interaction.followup.send("At least one dungeon has to stay enabled.", ephemeral=True)
+            return
+        values["dungeons"] = json.dumps(sorted(dungeons, key=SUPPORTED_DUNGEONS.index))
+    if max_keystone_level is not None:
+        values["max_keystone_level"] = max_keystone_level
+    if expiry_hours is not None:
+        values["expiry_hours"] = expiry_hours
+
+    if values:
+        try:
+            async with unit_of_work() as session:
+                config = await set_guild_config(session, interaction.guild_id, **values)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error in configure: {str(e)}")
+            await interaction.followup.send("An error occurred while saving the configuration. Please try again later.", ephemeral=True)
+            return
+        payload = guild_config_payload(config)
+        client.guild_configs.apply(payload)
+        await client.bus.publish("guild_config_changed", payload)
+        settings = client.guild_configs.get(interaction.guild_id)
+
+    await interaction.followup.send(
+        f"Dungeons: {', '.join(settings.dungeons)}\n"
+        f"Max keystone level: {settings.max_keystone_level}\n"
+        f"Group expiry: {settings.expiry_hours} hours",
+        ephemeral=True
+    )
+
+@client.tree.command(name="stats", description="Show how quickly groups fill, per dungeon or keystone level")
+@app_commands.describe(dungeon="Break the stats down by keystone level for this dungeon")
+@app_commands.choices(dungeon=[
+    app_commands.Choice(name=dungeon, value=dungeon) for dungeon in SUPPORTED_DUNGEONS
+])
+async def stats(interaction: discord.Interaction, dungeon: str = None):
+    await defer(interaction)
+
+    try:
+        async with SessionLocal() as session:
+            rows = await get_dungeon_stats(session, dungeon)
+    except SQLAlchemyError as e:
+        logger.error(f"Database error in stats: {str(e)}")
+        await interaction.followup.send("An error occurred while fetching stats. Please try again later.", ephemeral=True)
+        return
+
+    if not rows:
+        await interaction.followup.send("No stats have been collected yet.", ephemeral=True)
+        return
+    await interaction.followup.send(embed=create_stats_embed(rows, dungeon), ephemeral=True)
+
+def create_stats_embed(rows, dungeon=None):
+    # Without a dungeon, sum each dungeon's keystone levels
+    totals = {}
+    for row in rows:
+        key = f"+{row.keystone_level}" if dungeon else row.dungeon
+        total = totals.setdefault(key, [0, 0, 0, 0.0])
+        total[0] += row.groups_created
+        total[1] += row.groups_filled
+        total[2] += row.groups_expired
+        total[3] += row.fill_seconds_total
+
+    embed = discord.Embed(title=f"Group Stats: {dungeon}" if dungeon else "Group Stats", color=discord.Color.purple())
+    for key, (created, filled, expired, fill_seconds) in list(totals.items())[:25]:
+        fill_rate = f"{filled / created:.0%}" if created else "n/a"
+        avg_fill = f"{fill_seconds / filled / 60:.1f} min" if filled else "n/a"
+        embed.add_field(
+            name=key,
+            value=f"Groups: {created}\nFilled: {filled} ({fill_rate})\nExpired: {expired}\nAvg. time to fill: {avg_fill}",
+            inline=True
+        )
+    return embed
+
 def create_group_embed(group):
     embed = discord.Embed(title=f"LFG: {group.dungeon} +{group.keystone_level}", description=group.note or "No additional notes.")
     
@@ -282,46 +852,242 @@ def create_group_embed(group):
     embed.set_footer(text=f"Group ID: {group.id} | Status: {'Filled' if len(group.players) >= MAX_GROUP_SIZE else f'{len(group.players)}/{MAX_GROUP_SIZE}'}")
     return embed
 
+def group_embed(group):
+    return client.embeds.render(group, create_group_embed)
+
+def create_closed_embed(dungeon, keystone_level, reason):
+    return discord.Embed(title=f"LFG: {dungeon} +{keystone_level}", description=reason, color=discord.Color.dark_grey())
+
+class GroupView(discord.ui.View):
+    """Join/Leave/Disband buttons on a group post.
+
+    Each button's custom_id is `lfg:<action>:<group_id>`, so `on_interaction`
+    can route a click from the ID alone, including on posts made before a
+    restart. The view is never registered in discord.py's view store: it is
+    stopped before being sent, which makes `send`/`edit` serialise it without
+    keeping one object per post in memory.
+    """
+
+    def __init__(self, group_id: int, is_full: bool = False):
+        super().__init__(timeout=None)
+        self.add_item(discord.ui.Button(
+            label="Full" if is_full else "Join", style=discord.ButtonStyle.success,
+            custom_id=f"lfg:join:{group_id}", disabled=is_full
+        ))
+        self.add_item(discord.ui.Button(label="Leave", style=discord.ButtonStyle.secondary, custom_id=f"lfg:leave:{group_id}"))
+        self.add_item(discord.ui.Button(label="Disband", style=discord.ButtonStyle.danger, custom_id=f"lfg:disband:{group_id}"))
+        self.stop()
+
+def parse_group_button(custom_id: str):
+    """Returns `(action, group_id)` for a group post button, else None."""
+    parts = custom_id.split(":")
+    if len(parts) != 3 or parts[0] != "lfg" or parts[1] not in ("join", "leave", "disband") or not parts[2].isdigit():
+        return None
+    return parts[1], int(parts[2])
+
+def group_message(group):
+    if group.channel_id is None or group.message_id is None:
+        return None
+    return client.get_partial_messageable(group.channel_id).get_partial_message(group.message_id)
+
+async def post_group(group, channel, guild_id):
+    """Post a freshly created group; returns None and deletes the group if Discord rejects the post."""
+    try:
+        message = await channel.send(embed=group_embed(group), view=GroupView(group.id))
+    except discord.HTTPException as e:
+        # Nothing but the database knows about the group yet, so drop it there too
+        logger.warning(f"Could not post group {group.id} in channel {getattr(channel, 'id', None)}: {str(e)}")
+        async with unit_of_work() as session:
+            await delete_groups(session, [group.id])
+        return None
+    client.embeds.mark_sent(group.id, group.version)
+    async with unit_of_work() as session:
+        await set_group_message(session, group.id, guild_id, message.channel.id, message.id)
+    group.guild_id, group.channel_id, group.message_id = guild_id, message.channel.id, message.id
+    client.groups.sync_group(group)
+    client.event_log.record("created", group, player_id=group.host_id)
+    if client.owns_guild(group.guild_id):
+        client.expiry.schedule_at(group.id, client.group_deadline(group.guild_id, group.created_at, group.expires_at))
+    await publish_group_changed(group)
+    return message
+
+async def edit_group_message(group, interaction=None, **kwargs):
+    if interaction is not None:
+        # A button click is answered by editing its post in the response itself;
+        # any edit still queued for the post is older, so drop it
+        client.edits.discard(group.message_id)
+        await interaction.response.edit_message(**kwargs)
+        return
+    # Only the process owning the guild edits its posts, so edits from
+    # different processes can't overwrite each other out of order
+    if not client.owns_guild(group.guild_id):
+        return
+    message = group_message(group)
+    if message is not None:
+        client.edits.schedule(message, **kwargs)
+
+async def refresh_group_message(group, interaction=None):
+    # Nothing the post shows has changed since its last edit
+    if interaction is None and client.embeds.is_sent(group.id, group.version):
+        return
+    is_full = len(group.players) >= MAX_GROUP_SIZE
+    await edit_group_message(group, interaction, embed=group_embed(group), view=GroupView(group.id, is_full))
+    # Queued edits count as sent: the scheduler only ever sends the latest one
+    client.embeds.mark_sent(group.id, group.version)
+
+async def close_group_message(group, reason: str, interaction=None):
+    client.embeds.forget(group.id)
+    await edit_group_message(group, interaction, embed=create_closed_embed(group.dungeon, group.keystone_level, reason), view=None)
+
+async def publish_group_changed(group):
+    await client.bus.publish("group_changed", group_payload(group))
+
+async def publish_group_closed(group, reason: str):
+    await client.bus.publish("group_closed", {
+        "id": group.id,
+        "dungeon": group.dungeon,
+        "keystone_level": group.keystone_level,
+        "guild_id": group.guild_id,
+        "channel_id": group.channel_id,
+        "message_id": group.message_id,
+        "reason": reason
+    })
+
+async def join_group(group_id, player_id, interaction=None):
+    with bound_log_context(group_id=group_id):
+        async with client.group_locks(group_id):
+            async with unit_of_work() as session:
+                state = await add_player_to_group(session, group_id, player_id)
+                # Only the first fill counts; a refill after someone left doesn't
+                first_fill = state is not None and state.is_filled and await mark_group_filled(session, group_id)
+                group = await get_group(session, group_id) if state is not None else None
+        if group is None:
+            return None
+        logger.debug(f"Player {player_id} joined group {group_id}")
+
+        client.groups.sync_group(group)
+        client.event_log.record("joined", group, player_id=player_id)
+        if first_fill:
+            client.event_log.record("filled", group, elapsed_seconds=(datetime.utcnow() - group.created_at).total_seconds())
+        await refresh_group_message(group, interaction)
+        await publish_group_changed(group)
+        return group
+
+async def leave_group(group, player_id, interaction=None):
+    # `group` only needs id, guild/channel/message IDs, dungeon and keystone_level,
+    # so a cached GroupState works as well as a loaded Group
+    with bound_log_context(group_id=group.id):
+        async with client.group_locks(group.id):
+            async with unit_of_work() as session:
+                remaining = await remove_player_from_group(session, group.id, player_id)
+                updated = await get_group(session, group.id) if remaining else None
+        if remaining is None:
+            return None
+        logger.debug(f"Player {player_id} left group {group.id}")
+        client.event_log.record("left", group, player_id=player_id)
+
+        if remaining == 0:
+            client.event_log.record("disbanded", group)
+            client.groups.remove_group(group.id)
+            client.expiry.cancel(group.id)
+            client.matchmaking.forget_group(group.id)
+            await close_group_message(group, "This group has been disbanded.", interaction)
+            await publish_group_closed(group, "This group has been disbanded.")
+        else:
+            group = updated
+            client.groups.sync_group(group)
+            await refresh_group_message(group, interaction)
+            await publish_group_changed(group)
+        return remaining
+
+async def disband_group(group, interaction=None):
+    with bound_log_context(group_id=group.id):
+        async with client.group_locks(group.id):
+            async with unit_of_work() as session:
+                disbanded = await delete_groups(session, [group.id])
+        if not disbanded:
+            return False
+        logger.debug(f"Group {group.id} disbanded by its host")
+        client.event_log.record("disbanded", group)
+        client.groups.remove_group(group.id)
+        client.expiry.cancel(group.id)
+        client.matchmaking.forget_group(group.id)
+        await close_group_message(group, "This group has been disbanded by its host.", interaction)
+        await publish_group_closed(group, "This group has been disbanded by its host.")
+        return True
+
 @client.event
-async def on_reaction_add(reaction, user):
-    if user.bot:
+async def on_interaction(interaction: discord.Interaction):
+    # Slash commands go through the command tree; this only handles group post buttons
+    if interaction.type != discord.InteractionType.component:
+        return
+    button = parse_group_button(interaction.data.get("custom_id", ""))
+    if button is None:
         return
+    action, group_id = button
+    started_at = time.perf_counter()
+    bind_log_context(command=f"button_{action}", guild_id=interaction.guild_id, user_id=interaction.user.id, group_id=group_id)
+    status = "ok"
+    try:
+        await handle_group_button(interaction, action, group_id)
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        COMMAND_LATENCY.observe(time.perf_counter() - started_at, command=f"button_{action}", status=status)
+
+async def handle_group_button(interaction: discord.Interaction, action: str, group_id: int):
+    async def reply(content):
+        await interaction.response.send_message(content, ephemeral=True)
 
-    message = reaction.message
-    if len(message.embeds) == 0:
+    state = client.groups.groups.get(group_id)
+    if state is None:
+        await reply("This group is no longer active.")
         return
 
-    footer = message.embeds[0].footer.text
-    group_id = int(footer.split(":")[1].split("|")[0].strip())
+    player_id = client.groups.player_id_for(interaction.user.id)
+    if action == "join":
+        if player_id is not None and player_id in state.members:
+            await reply("You're already in this group.")
+            return
+        if state.is_full:
+            await reply("This group is already full.")
+            return
+        if player_id is not None and client.groups.group_of(player_id) is not None:
+            await reply("You're already in a group. Leave it first to join another.")
+            return
+    elif player_id is None or player_id not in state.members:
+        await reply("You're not in this group.")
+        return
+    elif action == "disband" and player_id != state.host_id:
+        await reply("Only the host can disband this group.")
+        return
 
     try:
-        with SessionLocal() as session:
-            group = get_group(session, group_id)
-            if not group:
-                return
+        if action == "leave":
+            if await leave_group(state, player_id, interaction) is None:
+                await reply("You're not in this group.")
+            return
+        if action == "disband":
+            if not await disband_group(state, interaction):
+                await reply("This group is no longer active.")
+            return
 
-            player = get_player(session, user.id)
+        if player_id is None:
+            async with SessionLocal() as session:
+                player = await get_player(session, interaction.user.id)
             if not player:
+                await reply("You need to link a character first. Use the /link_character command.")
                 return
+            player_id = player.id
+            client.groups.remember_player(player.discord_id, player_id)
 
-            if reaction.emoji == "✅" and len(group.players) < MAX_GROUP_SIZE:
-                player_groups = get_player_groups(session, player.id)
-                if player_groups:
-                    await message.remove_reaction(reaction, user)
-                    await user.send("You're already in a group. Leave it first to join another.")
-                    return
-
-                add_player_to_group(session, group, player)
-                if len(group.players) >= MAX_GROUP_SIZE:
-                    await message.clear_reactions()
-                    await message.add_reaction("🔒")  # Locked/Filled
-            elif reaction.emoji == "❌":
-                remove_player_from_group(session, group, player)
-
-            embed = create_group_embed(group)
-            await message.edit(embed=embed)
+        if await join_group(state.id, player_id, interaction) is None:
+            await reply("Couldn't join this group. It may have just filled up.")
     except SQLAlchemyError as e:
-        logger.error(f"Database error in on_reaction_add: {str(e)}")
+        logger.error(f"Database error in group button {action}: {str(e)}")
+        if not interaction.response.is_done():
+            await reply("An error occurred. Please try again later.")
 
 if __name__ == "__main__":
     client.run(DISCORD_TOKEN)
@@ -0,0 +1,235 @@
+import heapq
+import itertools
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import MAX_GROUP_SIZE, MATCHMAKING_BAND_WIDTH
+
+ROLES = ("tank", "healer", "dps")
+COMPOSITION = {"tank": 1, "healer": 1, "dps": 3}
+
+class QueueEntry:
+    __slots__ = ("discord_id", "player_id", "role", "score", "item_level", "dungeons",
+                 "min_level", "max_level", "guild_id", "channel_id", "seq", "key")
+
+    def __init__(self, discord_id: int, player_id: int, role: str, score: int, item_level: int,
+                 dungeons: Iterable[str], min_level: int, max_level: int, guild_id: int = None,
+                 channel_id: int = None):
+        self.discord_id = discord_id
+        self.player_id = player_id
+        self.role = role
+        self.score = score or 0
+        self.item_level = item_level or 0
+        self.dungeons = tuple(dungeons)
+        self.min_level = min_level
+        self.max_level = max_level
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.seq = 0
+        self.key = None
+
+    def accepts(self, level: int) -> bool:
+        return self.min_level <= level <= self.max_level
+
+class Bucket:
+    """Queued players for one (dungeon, keystone band), kept sorted per role
+    best-first by (score, item level, queue order)."""
+
+    __slots__ = ("roles",)
+
+    def __init__(self):
+        self.roles: Dict[str, list] = {role: [] for role in ROLES}
+
+    def add(self, entry: QueueEntry):
+        insort(self.roles[entry.role], (entry.key, entry))
+
+    def remove(self, entry: QueueEntry):
+        players = self.roles[entry.role]
+        index = bisect_left(players, (entry.key,))
+        if index < len(players) and players[index][1] is entry:
+            del players[index]
+
+    def __len__(self):
+        return sum(len(players) for players in self.roles.values())
+
+class MatchmakingEngine:
+    """In-memory matchmaking queue.
+
+    Players are bucketed by guild, dungeon and keystone band (`band_width`
+    levels per band; a player whose range spans several bands sits in each of
+    them), so players are only matched with groups and players of their own
+    guild. Each
+    bucket keeps one sorted list per role, so every decision looks at the head
+    of a few sorted lists instead of scanning the whole queue.
+    """
+
+    def __init__(self, band_width: int = MATCHMAKING_BAND_WIDTH, max_size: int = MAX_GROUP_SIZE,
+                 composition: Dict[str, int] = COMPOSITION):
+        self.band_width = band_width
+        self.max_size = max_size
+        self.composition = composition
+        self.entries: Dict[int, QueueEntry] = {}
+        self.buckets: Dict[Tuple[Optional[int], str, int], Bucket] = {}
+        self.guild_counts: Dict[Optional[int], int] = {}
+        # Roles of the players matchmaking placed, per group, so top-ups fill the roles still missing
+        self.group_roles: Dict[int, Dict[int, str]] = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, discord_id: int):
+        return discord_id in self.entries
+
+    def guilds(self):
+        """Guilds with at least one queued player."""
+        return self.guild_counts.keys()
+
+    def band(self, level: int) -> int:
+        return level // self.band_width
+
+    def enqueue(self, entry: QueueEntry):
+        self.dequeue(entry.discord_id)
+        entry.seq = next(self.counter)
+        entry.key = (-entry.score, -entry.item_level, entry.seq)
+        self._add(entry)
+
+    def requeue(self, entry: QueueEntry):
+        """Put back an entry whose match couldn't be persisted, keeping its place in the queue.
+        Does nothing if the player has queued again meanwhile."""
+        if entry.discord_id not in self.entries:
+            self._add(entry)
+
+    def assign(self, group_id: int, entry: QueueEntry):
+        """Remember the role `entry` was matched into `group_id` as."""
+        self.group_roles.setdefault(group_id, {})[entry.player_id] = entry.role
+
+    def forget_group(self, group_id: int):
+        self.group_roles.pop(group_id, None)
+
+    def needed_roles(self, group) -> Dict[str, int]:
+        """Open slots per role for a group with `id` and `members`.
+
+        Members who joined by hand have no known role; they are counted as dps
+        first, then healer, then tank.
+        """
+        roles = self.group_roles.get(group.id, {})
+        needed = dict(self.composition)
+        unknown = 0
+        for player_id in group.members:
+            role = roles.get(player_id)
+            if role is None:
+                unknown += 1
+            elif needed.get(role):
+                needed[role] -= 1
+        for role in ("dps", "healer", "tank"):
+            taken = min(unknown, needed.get(role, 0))
+            if taken:
+                needed[role] -= taken
+                unknown -= taken
+        return needed
+
+    def _add(self, entry: QueueEntry):
+        self.entries[entry.discord_id] = entry
+        self.guild_counts[entry.guild_id] = self.guild_counts.get(entry.guild_id, 0) + 1
+        for bucket_key in self._bucket_keys(entry):
+            bucket = self.buckets.get(bucket_key)
+            if bucket is None:
+                bucket = self.buckets[bucket_key] = Bucket()
+            bucket.add(entry)
+
+    def dequeue(self, discord_id: int) -> Optional[QueueEntry]:
+        entry = self.entries.pop(discord_id, None)
+        if entry is None:
+            return None
+        self.guild_counts[entry.guild_id] -= 1
+        if not self.guild_counts[entry.guild_id]:
+            del self.guild_counts[entry.guild_id]
+        for bucket_key in self._bucket_keys(entry):
+            bucket = self.buckets.get(bucket_key)
+            if bucket is None:
+                continue
+            bucket.remove(entry)
+            if not len(bucket):
+                del self.buckets[bucket_key]
+        return entry
+
+    def fill_open_group(self, guild_id: Optional[int], dungeon: str, level: int, needed: Dict[str, int]) -> List[QueueEntry]:
+        """Take the best queued players in the guild who accept this dungeon and
+        level, at most `needed[role]` of each role."""
+        bucket = self.buckets.get((guild_id, dungeon, self.band(level)))
+        open_slots = sum(needed.values())
+        if bucket is None or open_slots <= 0:
+            return []
+
+        needed = dict(needed)
+        picked = []
+        for _, entry in heapq.merge(*(bucket.roles[role] for role in ROLES if needed.get(role))):
+            if needed[entry.role] and entry.accepts(level):
+                picked.append(entry)
+                needed[entry.role] -= 1
+                if len(picked) == open_slots:
+                    break
+        for entry in picked:
+            self.dequeue(entry.discord_id)
+        return picked
+
+    def form_groups(self) -> List[Tuple[str, int, List[QueueEntry]]]:
+        """Form as many full groups as the queue allows; each is returned as
+        `(dungeon, keystone_level, members)` with the tank first."""
+        formed = []
+        for bucket_key in list(self.buckets):
+            while True:
+                bucket = self.buckets.get(bucket_key)
+                if bucket is None or any(len(bucket.roles[role]) < count for role, count in self.composition.items()):
+                    break
+                match = self._pick_group(bucket_key, bucket)
+                if match is None:
+                    break
+                level, members = match
+                for entry in members:
+                    self.dequeue(entry.discord_id)
+                formed.append((bucket_key[1], level, members))
+        return formed
+
+    def tick(self, open_groups) -> Tuple[List[Tuple[int, List[QueueEntry]]], List[Tuple[str, int, List[QueueEntry]]]]:
+        """Run one matchmaking round.
+
+        `open_groups` yields objects with `id`, `guild_id`, `dungeon`,
+        `keystone_level` and `members` (e.g. cached GroupStates). Open groups are topped up first, then
+        new groups are formed from whoever is left.
+        """
+        joins = []
+        for group in open_groups:
+            if not self.entries:
+                break
+            if len(group.members) >= self.max_size:
+                continue
+            picked = self.fill_open_group(group.guild_id, group.dungeon, group.keystone_level, self.needed_roles(group))
+            if picked:
+                joins.append((group.id, picked))
+        return joins, self.form_groups()
+
+    def _pick_group(self, bucket_key, bucket: Bucket):
+        band = bucket_key[2]
+        low = band * self.band_width
+        high = low + self.band_width - 1
+        members = []
+        for role in ROLES:
+            needed = self.composition.get(role, 0)
+            for _, entry in bucket.roles[role]:
+                if not needed:
+                    break
+                new_low = max(low, entry.min_level)
+                new_high = min(high, entry.max_level)
+                if new_low > new_high:
+                    continue
+                low, high = new_low, new_high
+                members.append(entry)
+                needed -= 1
+            if needed:
+                return None
+        return high, members
+
+    def _bucket_keys(self, entry: QueueEntry):
+        bands = range(self.band(entry.min_level), self.band(entry.max_level) + 1)
+        return [(entry.guild_id, dungeon, band) for dungeon in entry.dungeons for band in bands]
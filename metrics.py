@@ -0,0 +1,217 @@
+import bisect
+import logging
+import random
+import time
+from typing import Dict, Iterable, Tuple
+from aiohttp import web
+from sqlalchemy import event
+from config import DB_SLOW_QUERY_MS, DB_SLOW_QUERY_SAMPLE_RATE
+from logger import logger, log_handler, log_sampler
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label_key(labelnames, labels) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _format_labels(labelnames, key, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for key, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str, callback):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} gauge"
+        try:
+            yield f"{self.name} {float(self.callback())}"
+        except Exception:
+            return
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        series = self.series.get(key)
+        if series is None:
+            # per-bucket counts, then +Inf count and sum
+            series = self.series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, 'le="' + le + '"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+COMMAND_LATENCY = REGISTRY.register(Histogram(
+    "lfg_command_duration_seconds", "Time from receiving a command to its handler finishing.", ("command", "status")
+))
+FOLLOWUP_LATENCY = REGISTRY.register(Histogram(
+    "lfg_interaction_followup_seconds", "Time from deferring an interaction to the handler's followup.", ("command",)
+))
+DB_QUERIES = REGISTRY.register(Counter(
+    "lfg_db_queries_total", "SQL statements executed.", ("statement",)
+))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "lfg_db_query_duration_seconds", "SQL statement execution time.", ("statement",)
+))
+DB_POOL_WAIT = REGISTRY.register(Histogram(
+    "lfg_db_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the pool."
+))
+RAIDERIO_LATENCY = REGISTRY.register(Histogram(
+    "lfg_raiderio_request_duration_seconds", "Raider.IO API request time.", ("status",)
+))
+RAIDERIO_REQUESTS = REGISTRY.register(Counter(
+    "lfg_raiderio_requests_total", "Raider.IO API requests by response status.", ("status",)
+))
+RAIDERIO_CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "lfg_raiderio_cache_lookups_total", "Raider.IO profile cache lookups by result (fresh, stale, miss).", ("result",)
+))
+SCORE_REFRESH_ROWS = REGISTRY.register(Counter(
+    "lfg_score_refresh_rows_total", "Characters handled by the score refresh, by result (refreshed, failed).", ("result",)
+))
+SCORE_REFRESH_DURATION = REGISTRY.register(Histogram(
+    "lfg_score_refresh_duration_seconds", "Duration of one score refresh cycle.",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+))
+DISCORD_RATE_LIMITS = REGISTRY.register(Counter(
+    "lfg_discord_rate_limits_total", "Discord API rate limit responses seen by discord.py."
+))
+LOG_DROPPED = REGISTRY.register(Gauge(
+    "lfg_log_records_dropped", "Log records dropped because the log queue was full.", lambda: log_handler.dropped
+))
+LOG_SAMPLED_OUT = REGISTRY.register(Gauge(
+    "lfg_log_records_sampled_out", "Log records discarded by level-based sampling.", lambda: log_sampler.sampled_out
+))
+LOG_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "lfg_log_queue_depth", "Log records waiting to be written.", lambda: log_handler.queue.qsize()
+))
+
+def _statement_kind(statement: str) -> str:
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+def instrument_engine(engine, slow_query_ms: float = DB_SLOW_QUERY_MS, sample_rate: float = DB_SLOW_QUERY_SAMPLE_RATE):
+    """Record query counts/durations, log a sample of slow queries and time
+    pool checkouts for `engine` (sync or async)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    # The start time lives on the execution context rather than the connection,
+    # since after_cursor_execute doesn't fire for statements that raise
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._lfg_query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._lfg_query_started
+        kind = _statement_kind(statement)
+        DB_QUERIES.inc(statement=kind)
+        DB_QUERY_LATENCY.observe(elapsed, statement=kind)
+        if elapsed * 1000 >= slow_query_ms and random.random() < sample_rate:
+            logger.warning(f"Slow query ({elapsed * 1000:.1f} ms): {statement}")
+
+    # Pool has no "waiting for checkout" event, so time the call that blocks on it
+    pool = sync_engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+    REGISTRY.register(Gauge("lfg_db_pool_checked_out", "Connections currently checked out of the pool.",
+                            lambda: pool.checkedout() if hasattr(pool, "checkedout") else 0))
+
+def instrument_edits(scheduler):
+    """Expose an `EditScheduler`'s counters."""
+    for name, documentation in (
+        ("requested", "Message edits requested, before coalescing."),
+        ("sent", "Message edits sent to Discord."),
+        ("failed", "Message edits Discord rejected."),
+        ("pending", "Message edits waiting to be sent.")
+    ):
+        REGISTRY.register(Gauge(f"lfg_message_edits_{name}", documentation,
+                                lambda name=name: scheduler.stats()[name]))
+
+class RateLimitLogHandler(logging.Handler):
+    """Counts discord.py's "being rate limited" log records."""
+
+    def emit(self, record: logging.LogRecord):
+        if "rate limit" in record.getMessage().lower():
+            DISCORD_RATE_LIMITS.inc()
+
+def instrument_discord():
+    handler = RateLimitLogHandler(level=logging.WARNING)
+    logging.getLogger("discord.http").addHandler(handler)
+    logging.getLogger("discord.gateway").addHandler(handler)
+
+async def start_metrics_server(host: str, port: int):
+    async def handle_metrics(request):
+        return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
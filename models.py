@@ -1,23 +1,33 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table, DateTime
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Boolean, ForeignKey, Table, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 
 Base = declarative_base()
 
+# SQLite's CURRENT_TIMESTAMP has whole-second text; bind values the same way so
+# keyset and expiry comparisons against server defaults line up.
+Timestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
 group_players = Table('group_players', Base.metadata,
-    Column('group_id', Integer, ForeignKey('groups.id')),
-    Column('player_id', Integer, ForeignKey('players.id'))
+    Column('group_id', Integer, ForeignKey('groups.id', ondelete='CASCADE'), primary_key=True),
+    Column('player_id', Integer, ForeignKey('players.id', ondelete='CASCADE'), primary_key=True),
+    # A player can only be in one group at a time; also serves get_player_groups
+    UniqueConstraint('player_id', name='uq_group_players_player_id')
 )
 
 class Player(Base):
     __tablename__ = 'players'
 
     id = Column(Integer, primary_key=True)
-    discord_id = Column(Integer, unique=True)
+    discord_id = Column(BigInteger, unique=True)
     battletag = Column(String, unique=True)
-    created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, onupdate=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, onupdate=func.now())
 
     characters = relationship("Character", back_populates="player")
     groups = relationship("Group", secondary=group_players, back_populates="players")
@@ -32,11 +42,16 @@ class Character(Base):
     class_name = Column(String)
     item_level = Column(Integer)
     raiderio_score = Column(Integer)
-    created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, onupdate=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, onupdate=func.now())
 
     player = relationship("Player", back_populates="characters")
 
+    __table_args__ = (
+        UniqueConstraint('player_id', 'name', 'realm', name='uq_characters_player_name_realm'),
+        Index('ix_characters_refreshed_at', func.coalesce(updated_at, created_at)),
+    )
+
 class Group(Base):
     __tablename__ = 'groups'
 
@@ -45,9 +60,89 @@ class Group(Base):
     keystone_level = Column(Integer)
     note = Column(String)
     is_filled = Column(Boolean, default=False)
-    host_id = Column(Integer, ForeignKey('players.id'))
-    created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, onupdate=func.now())
+    member_count = Column(Integer, nullable=False, default=0, server_default='0')
+    # Bumped on every change to what the group's embed shows (members, host, their characters)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    host_id = Column(Integer, ForeignKey('players.id'), index=True)
+    guild_id = Column(BigInteger)
+    channel_id = Column(BigInteger)
+    message_id = Column(BigInteger, unique=True, index=True)
+    created_at = Column(Timestamp, server_default=func.now(), index=True)
+    updated_at = Column(Timestamp, onupdate=func.now())
+    # When the group first reached full size; a refill after someone leaves keeps it
+    filled_at = Column(Timestamp)
+    # Fixed at creation from the guild's expiry setting, so changing it only affects new groups
+    expires_at = Column(Timestamp)
 
     host = relationship("Player", foreign_keys=[host_id])
-    players = relationship("Player", secondary=group_players, back_populates="groups")
\ No newline at end of file
+    players = relationship("Player", secondary=group_players, back_populates="groups")
+
+    __table_args__ = (
+        Index('ix_groups_is_filled_created_at', 'is_filled', 'created_at'),
+        # Serves the per-guild /list_groups keyset scan
+        Index('ix_groups_guild_id_is_filled_created_at', 'guild_id', 'is_filled', 'created_at', 'id'),
+    )
+
+class GuildConfig(Base):
+    """Per-guild overrides of the global settings; NULL means use the default."""
+    __tablename__ = 'guild_configs'
+
+    guild_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    # JSON list of enabled dungeons
+    dungeons = Column(String)
+    max_keystone_level = Column(Integer)
+    expiry_hours = Column(Integer)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+class GroupEvent(Base):
+    """Append-only history of group lifecycle events; outlives the groups themselves."""
+    __tablename__ = 'group_events'
+
+    # SQLite only autoincrements INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    group_id = Column(Integer, nullable=False)
+    event = Column(String, nullable=False)
+    player_id = Column(Integer)
+    guild_id = Column(BigInteger)
+    dungeon = Column(String)
+    keystone_level = Column(Integer)
+    # Seconds from the group being created until this event, for filled/expired
+    elapsed_seconds = Column(Float)
+    created_at = Column(Timestamp, nullable=False, server_default=func.now())
+
+class DungeonStats(Base):
+    """Per dungeon and keystone level rollup of `group_events`."""
+    __tablename__ = 'dungeon_stats'
+
+    dungeon = Column(String, primary_key=True)
+    keystone_level = Column(Integer, primary_key=True)
+    groups_created = Column(Integer, nullable=False, default=0)
+    groups_filled = Column(Integer, nullable=False, default=0)
+    groups_expired = Column(Integer, nullable=False, default=0)
+    joins = Column(Integer, nullable=False, default=0)
+    leaves = Column(Integer, nullable=False, default=0)
+    fill_seconds_total = Column(Float, nullable=False, default=0)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+class BotState(Base):
+    """Small key/value store for bot-wide bookkeeping, e.g. the last synced command tree hash."""
+    __tablename__ = 'bot_state'
+
+    key = Column(String, primary_key=True)
+    value = Column(String)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+
+class RaiderIOProfile(Base):
+    """Last Raider.IO profile response per character, so the cache survives restarts."""
+    __tablename__ = 'raiderio_profiles'
+
+    # Lowercased lookup key
+    region = Column(String, primary_key=True)
+    realm = Column(String, primary_key=True)
+    name = Column(String, primary_key=True)
+    fields = Column(String, nullable=False)
+    # JSON response body
+    profile = Column(String, nullable=False)
+    etag = Column(String)
+    last_modified = Column(String)
+    fetched_at = Column(Timestamp, nullable=False)
@@ -0,0 +1,75 @@
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.exc import SQLAlchemyError
+from config import RAIDERIO_CACHE_SIZE
+from database import get_raiderio_profile, save_raiderio_profile, unit_of_work
+from logger import logger
+
+class CachedProfile:
+    __slots__ = ("profile", "fields", "etag", "last_modified", "fetched_at")
+
+    def __init__(self, profile: dict, fields: str, etag: Optional[str], last_modified: Optional[str],
+                 fetched_at: datetime):
+        self.profile = profile
+        self.fields = fields
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def age(self, now: datetime) -> float:
+        return (now - self.fetched_at).total_seconds()
+
+class ProfileCache:
+    """Raider.IO profiles keyed by `(region, realm, name)`, lowercased.
+
+    An LRU of up to `max_entries` profiles sits in front of the
+    `raiderio_profiles` table, which is written through on every store so the
+    cache is still warm after a restart. Freshness is left to the caller.
+    """
+
+    def __init__(self, session_factory=None, max_entries: int = RAIDERIO_CACHE_SIZE):
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, CachedProfile]" = OrderedDict()
+
+    async def get(self, key: tuple) -> Optional[CachedProfile]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        if self.session_factory is None:
+            return None
+        try:
+            async with self.session_factory() as session:
+                row = await get_raiderio_profile(session, *key)
+        except SQLAlchemyError as e:
+            logger.warning(f"Failed to load cached Raider.IO profile {key}: {str(e)}")
+            return None
+        if row is None:
+            return None
+        entry = CachedProfile(json.loads(row.profile), row.fields, row.etag, row.last_modified, row.fetched_at)
+        self._remember(key, entry)
+        return entry
+
+    async def put(self, key: tuple, entry: CachedProfile):
+        self._remember(key, entry)
+        if self.session_factory is None:
+            return
+        region, realm, name = key
+        try:
+            async with unit_of_work(self.session_factory) as session:
+                await save_raiderio_profile(
+                    session, region=region, realm=realm, name=name, fields=entry.fields,
+                    profile=json.dumps(entry.profile), etag=entry.etag, last_modified=entry.last_modified,
+                    fetched_at=entry.fetched_at
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Failed to store Raider.IO profile {key}: {str(e)}")
+
+    def _remember(self, key: tuple, entry: CachedProfile):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+from typing import List
+from sqlalchemy import event
+
+# Maximum SQL statements each handler may issue for one invocation
+QUERY_BUDGETS = {
+    "link_character": 3,
+    "update_character": 3,
+    "lfg": 7,
+    "leave": 6,
+    "my_groups": 2,
+    "group_info": 3,
+    "list_groups": 1,
+    # Includes the SAVEPOINT and RELEASE around add_player_to_group
+    "button_join": 8,
+    "button_leave": 6,
+    "button_disband": 3,
+    "stats": 1,
+    "configure": 2,
+}
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+class QueryCounter:
+    """Counts SQL statements sent through `engine` while the block runs."""
+
+    def __init__(self, engine):
+        self.engine = getattr(engine, "sync_engine", engine)
+        self.count = 0
+        self.statements: List[str] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+        return False
+
+@contextmanager
+def query_budget(engine, handler: str, budget: int = None):
+    """Fail with QueryBudgetExceeded if the block issues more statements than
+    `handler`'s budget in QUERY_BUDGETS (or `budget`, if given)."""
+    budget = QUERY_BUDGETS[handler] if budget is None else budget
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        statements = "\n".join(counter.statements)
+        raise QueryBudgetExceeded(f"{handler} issued {counter.count} queries (budget {budget}):\n{statements}")
@@ -0,0 +1,184 @@
+import asyncio
+import random
+import time
+from datetime import datetime
+from typing import Dict, Optional, Set
+import aiohttp
+from config import (
+    RAIDERIO_BASE_URL,
+    RAIDERIO_TIMEOUT,
+    RAIDERIO_MAX_CONNECTIONS,
+    RAIDERIO_RATE_LIMIT,
+    RAIDERIO_BURST,
+    RAIDERIO_MAX_RETRIES,
+    RAIDERIO_PROFILE_FIELDS,
+    RAIDERIO_CACHE_TTL,
+    RAIDERIO_CACHE_MAX_STALE
+)
+from logger import logger
+from metrics import RAIDERIO_CACHE_LOOKUPS, RAIDERIO_LATENCY, RAIDERIO_REQUESTS
+from profilecache import CachedProfile, ProfileCache
+from ratelimit import TokenBucket
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class RaiderIOClient:
+    """Long-lived Raider.IO API client shared by every command.
+
+    Holds one pooled aiohttp session, throttles outgoing requests with a token
+    bucket, retries 429/5xx responses with backoff and coalesces identical
+    lookups that are already in flight into a single request.
+
+    With a `cache`, profiles younger than `ttl` seconds are served without a
+    request. Older ones up to `max_stale` seconds are still served, while a
+    background request revalidates them; revalidation sends the cached ETag
+    and Last-Modified so an unchanged profile costs only a 304.
+    """
+
+    def __init__(self, base_url: str = RAIDERIO_BASE_URL, timeout: float = RAIDERIO_TIMEOUT,
+                 max_connections: int = RAIDERIO_MAX_CONNECTIONS, rate_limit: float = RAIDERIO_RATE_LIMIT,
+                 burst: int = RAIDERIO_BURST, max_retries: int = RAIDERIO_MAX_RETRIES,
+                 cache: Optional[ProfileCache] = None, ttl: float = RAIDERIO_CACHE_TTL,
+                 max_stale: float = RAIDERIO_CACHE_MAX_STALE):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rate_limit, burst)
+        self.cache = cache
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.inflight: Dict[tuple, asyncio.Future] = {}
+        self.revalidations: Set[asyncio.Task] = set()
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        for task in self.revalidations:
+            task.cancel()
+        await asyncio.gather(*self.revalidations, return_exceptions=True)
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def get_profile(self, name: str, realm: str, region: str = 'us',
+                          fields: str = RAIDERIO_PROFILE_FIELDS, allow_stale: bool = True) -> Optional[dict]:
+        key = (region.lower(), realm.lower(), name.lower())
+        cached = await self.cache.get(key) if self.cache is not None else None
+        if cached is not None and cached.fields != fields:
+            cached = None
+        if cached is not None:
+            age = cached.age(datetime.utcnow())
+            if age < self.ttl:
+                RAIDERIO_CACHE_LOOKUPS.inc(result="fresh")
+                return cached.profile
+            if allow_stale and age < self.max_stale:
+                RAIDERIO_CACHE_LOOKUPS.inc(result="stale")
+                if (key, fields) not in self.inflight:
+                    task = asyncio.create_task(self._load(key, name, realm, region, fields, cached))
+                    self.revalidations.add(task)
+                    task.add_done_callback(self._revalidated)
+                return cached.profile
+        RAIDERIO_CACHE_LOOKUPS.inc(result="miss")
+        return await self._load(key, name, realm, region, fields, cached)
+
+    async def get_score(self, name: str, realm: str, region: str = 'us', allow_stale: bool = True) -> Optional[int]:
+        profile = await self.get_profile(name, realm, region, allow_stale=allow_stale)
+        if profile is None:
+            return None
+        try:
+            return int(profile['mythic_plus_scores_by_season'][0]['scores']['all'])
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+    async def _load(self, key: tuple, name: str, realm: str, region: str, fields: str,
+                    cached: Optional[CachedProfile]) -> Optional[dict]:
+        inflight_key = (key, fields)
+        future = self.inflight.get(inflight_key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[inflight_key] = future
+        try:
+            entry = await self._fetch_profile(name, realm, region, fields, cached)
+            if entry is not None and self.cache is not None:
+                await self.cache.put(key, entry)
+            profile = entry.profile if entry is not None else None
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures don't warn on garbage collection
+            future.exception()
+            raise
+        else:
+            future.set_result(profile)
+            return profile
+        finally:
+            del self.inflight[inflight_key]
+
+    def _revalidated(self, task: asyncio.Task):
+        self.revalidations.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Raider.IO revalidation failed: {task.exception()!r}")
+
+    async def _fetch_profile(self, name: str, realm: str, region: str, fields: str,
+                             cached: Optional[CachedProfile] = None) -> Optional[CachedProfile]:
+        await self.start()
+        url = f"{self.base_url}/api/v1/characters/profile"
+        params = {'region': region, 'realm': realm, 'name': name, 'fields': fields}
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            retry_after = None
+            started = time.perf_counter()
+            status = "error"
+            try:
+                async with self.session.get(url, params=params, headers=headers) as response:
+                    status = str(response.status)
+                    if response.status == 304 and cached is not None:
+                        return CachedProfile(cached.profile, fields, cached.etag, cached.last_modified, datetime.utcnow())
+                    if response.status == 200:
+                        return CachedProfile(
+                            await response.json(), fields, response.headers.get('ETag'),
+                            response.headers.get('Last-Modified'), datetime.utcnow()
+                        )
+                    if response.status not in RETRY_STATUSES:
+                        return None
+                    retry_after = response.headers.get('Retry-After')
+                    logger.warning(f"Raider.IO returned {response.status} for {name}-{realm} (attempt {attempt + 1})")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = "timeout" if isinstance(e, asyncio.TimeoutError) else "error"
+                logger.warning(f"Raider.IO request failed for {name}-{realm} (attempt {attempt + 1}): {e!r}")
+            finally:
+                RAIDERIO_LATENCY.observe(time.perf_counter() - started, status=status)
+                RAIDERIO_REQUESTS.inc(status=status)
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+        return None
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        return min(0.5 * 2 ** attempt, 8.0) + random.uniform(0, 0.25)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from config import (
+    SCORE_REFRESH_MAX_AGE_HOURS,
+    SCORE_REFRESH_BUDGET,
+    SCORE_REFRESH_CONCURRENCY,
+    SCORE_REFRESH_BATCH_SIZE
+)
+from database import get_stale_characters, bulk_update_character_scores, touch_characters, unit_of_work
+from logger import logger
+from metrics import SCORE_REFRESH_DURATION, SCORE_REFRESH_ROWS
+
+async def refresh_stale_scores(session_factory, raiderio,
+                               max_age_hours: int = SCORE_REFRESH_MAX_AGE_HOURS,
+                               budget: int = SCORE_REFRESH_BUDGET,
+                               concurrency: int = SCORE_REFRESH_CONCURRENCY,
+                               batch_size: int = SCORE_REFRESH_BATCH_SIZE):
+    """Refresh up to `budget` of the stalest Raider.IO scores.
+
+    Lookups run with at most `concurrency` requests in flight, and results are
+    written back in batches of `batch_size`, one transaction per batch. No
+    database connection is held while waiting on the API. The IDs of groups
+    whose members' scores changed come back in `changed_groups`. Characters
+    whose lookup failed are marked as refreshed too, so they don't take the
+    stalest slots of every run.
+    """
+    started = time.monotonic()
+    cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+    async with session_factory() as session:
+        stale = await get_stale_characters(session, cutoff, budget)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = {}
+    failed = []
+    stats = {"selected": len(stale), "refreshed": 0, "failed": 0, "changed_groups": set()}
+
+    async def flush():
+        if not pending and not failed:
+            return
+        batch = dict(pending)
+        pending.clear()
+        failed_ids = list(failed)
+        failed.clear()
+        async with unit_of_work(session_factory) as session:
+            stats["changed_groups"].update(await bulk_update_character_scores(session, batch))
+            await touch_characters(session, failed_ids)
+        stats["refreshed"] += len(batch)
+
+    async def fetch(row):
+        async with semaphore:
+            try:
+                # A stale cached score would just be written back, so always revalidate
+                return row.id, await raiderio.get_score(row.name, row.realm, allow_stale=False)
+            except Exception as e:
+                logger.warning(f"Score refresh lookup failed: {e!r}")
+                return row.id, None
+
+    for next_result in asyncio.as_completed([fetch(row) for row in stale]):
+        character_id, score = await next_result
+        if score is None:
+            stats["failed"] += 1
+            failed.append(character_id)
+        else:
+            pending[character_id] = score
+        if len(pending) + len(failed) >= batch_size:
+            await flush()
+    await flush()
+
+    elapsed = time.monotonic() - started
+    stats["elapsed"] = elapsed
+    stats["rows_per_second"] = stats["refreshed"] / elapsed if elapsed > 0 else 0.0
+    SCORE_REFRESH_ROWS.inc(stats["refreshed"], result="refreshed")
+    SCORE_REFRESH_ROWS.inc(stats["failed"], result="failed")
+    SCORE_REFRESH_DURATION.observe(elapsed)
+    if stale:
+        logger.info(
+            f"Score refresh: {stats['refreshed']}/{stats['selected']} refreshed, {stats['failed']} failed "
+            f"in {elapsed:.2f}s ({stats['rows_per_second']:.1f} rows/s)"
+        )
+    return stats
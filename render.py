@@ -0,0 +1,46 @@
+from collections import OrderedDict
+from typing import Callable, Dict
+from config import EMBED_CACHE_SIZE
+
+class EmbedCache:
+    """Rendered group embeds memoized by `(group_id, version)`.
+
+    A group's version changes whenever anything its embed shows does, so a
+    cached embed never needs invalidating; old versions just age out of the
+    LRU. `sent` records the version last queued for each group's post, so an
+    edit that wouldn't change anything can be skipped.
+    """
+
+    def __init__(self, max_entries: int = EMBED_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[tuple, object]" = OrderedDict()
+        self.sent: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, group_id: int, version: int):
+        embed = self.entries.get((group_id, version))
+        if embed is not None:
+            self.entries.move_to_end((group_id, version))
+            self.hits += 1
+        return embed
+
+    def render(self, group, build: Callable):
+        """The embed for an ORM `Group` with players loaded, built with `build` on a miss."""
+        embed = self.get(group.id, group.version)
+        if embed is None:
+            self.misses += 1
+            embed = build(group)
+            self.entries[(group.id, group.version)] = embed
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return embed
+
+    def is_sent(self, group_id: int, version: int) -> bool:
+        return self.sent.get(group_id) == version
+
+    def mark_sent(self, group_id: int, version: int):
+        self.sent[group_id] = version
+
+    def forget(self, group_id: int):
+        self.sent.pop(group_id, None)